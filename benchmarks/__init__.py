@@ -0,0 +1 @@
+"Benchmarks of the application, run them with ``python -m benchmarks.<name>``"
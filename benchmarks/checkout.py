@@ -0,0 +1,158 @@
+"""Runs concurrent checkouts and item reads from several processes on SQLite
+
+Each process stands for a gunicorn worker with its own connections. Compares
+the SQLITE_PRAGMAS of the configuration with the SQLite defaults (rollback
+journal, no connection pool) on the same database; the journal mode is
+persistent so every run sets it. Seed the database first with benchmarks.seed.
+
+Usage: python -m benchmarks.checkout [--processes 4] [--seconds 10] [--read-ratio 0.5] [--output report.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from werkzeug.utils import import_string
+
+from .load import TestClientTransport, git_commit, load_catalog, login, percentile
+
+MODES = ('defaults', 'tuned')
+
+def mode_config(mode: str) -> type:
+    """Creates the configuration a run uses
+    Parameters
+    ----------
+    mode: str
+        defaults for the SQLite defaults, tuned for the configured pragmas
+    Returns
+    -------
+    type
+        a subclass of the class named by CONFIG_TYPE
+    """
+    base = import_string(os.getenv('CONFIG_TYPE', 'config.DevelopmentConfig'))
+    if mode == 'tuned':
+        from config import engine_options
+        return type('TunedConfig', (base,), {
+            'SQLALCHEMY_ENGINE_OPTIONS': engine_options(base.SQLALCHEMY_DATABASE_URI),
+            'SQL_PROFILE_SAMPLE_RATE': 0,
+        })
+    return type('DefaultsConfig', (base,), {
+        'SQLITE_PRAGMAS': {'journal_mode': 'DELETE'},
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'SQL_PROFILE_SAMPLE_RATE': 0,
+    })
+
+def worker(mode: str, seconds: float, read_ratio: float, seed: int, start, results) -> None:
+    "Replays checkouts and reads until the time is up and sends back its samples"
+    from server import create_app
+    config = mode_config(mode)
+    module = sys.modules[__name__]
+    setattr(module, config.__name__, config)
+    os.environ['CONFIG_TYPE'] = f'{__name__}.{config.__name__}'
+    app = create_app()
+    item_ids, _ = load_catalog(app)
+    transport = TestClientTransport(app)
+    token = login(transport, os.getenv('ADMIN_USERNAME', 'admin'), os.getenv('ADMIN_PASSWORD', 'admin'))
+    rng = random.Random(seed)
+    samples = {'checkout': ([], {}), 'read': ([], {})}
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        item_id = rng.choice(item_ids)
+        if rng.random() < read_ratio:
+            name, args = 'read', ('GET', f'/api/v1/item/{item_id}')
+            kwargs = {}
+        else:
+            name, args = 'checkout', ('POST', '/api/v1/purchase')
+            kwargs = {'json': {'items': [{'id': item_id, 'quantity': 1}]},
+                      'headers': {'X-CSRF-Token': token}}
+        begin = time.perf_counter()
+        try:
+            status, _ = transport.request(*args, **kwargs)
+        except Exception as e:
+            status = type(e).__name__
+        latency, statuses = samples[name]
+        latency.append((time.perf_counter() - begin) * 1000)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    results.put(samples)
+
+def run(mode: str, processes: int, seconds: float, read_ratio: float) -> dict:
+    """Runs the workers of a mode at the same time
+    Parameters
+    ----------
+    mode: str
+        defaults or tuned
+    processes: int
+        the number of concurrent worker processes
+    seconds: float
+        how long the workers send requests
+    read_ratio: float
+        the share of the requests that read an item instead of checking out
+    Returns
+    -------
+    dict
+        the throughput, latency percentiles and status codes of the checkouts
+        and the reads
+    """
+    context = multiprocessing.get_context('fork')
+    start = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=worker, args=(mode, seconds, read_ratio, i, start, results))
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+    try:
+        start.wait(timeout=120)
+    except multiprocessing.BrokenBarrierError:
+        for process in workers:
+            process.terminate()
+        raise RuntimeError('The workers did not start, run one with --processes 1 to see why')
+    merged = {'checkout': ([], {}), 'read': ([], {})}
+    for _ in workers:
+        for name, (latency, statuses) in results.get().items():
+            merged[name][0].extend(latency)
+            for status, count in statuses.items():
+                merged[name][1][status] = merged[name][1].get(status, 0) + count
+    for process in workers:
+        process.join()
+
+    report = {'mode': mode}
+    for name, (latency, statuses) in merged.items():
+        if not latency:
+            continue
+        report[name] = {
+            'requests': len(latency),
+            'throughput_rps': round(len(latency) / seconds, 1),
+            'ok_rps': round(statuses.get('200', 0) / seconds, 1),
+            'p50_ms': round(percentile(latency, 50), 3),
+            'p95_ms': round(percentile(latency, 95), 3),
+            'p99_ms': round(percentile(latency, 99), 3),
+            'status': statuses,
+        }
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--read-ratio', type=float, default=0.5)
+    parser.add_argument('--mode', choices=MODES, action='append',
+                        help='run only these modes, defaults to both')
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'processes': args.processes,
+        'seconds': args.seconds,
+        'read_ratio': args.read_ratio,
+        'runs': [run(mode, args.processes, args.seconds, args.read_ratio) for mode in args.mode or MODES],
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
@@ -0,0 +1,243 @@
+"""Replays a mix of page views and checkouts and reports their latency
+
+Runs against the configured database through the Flask test client, or
+against a running server with --url. Seed the database first with
+benchmarks.seed. The JSON report can be saved per commit and compared.
+
+Usage: python -m benchmarks.load [--requests 1000] [--url http://127.0.0.1:8000] [--output report.json]
+"""
+import argparse
+import bisect
+import json
+import random
+import re
+import statistics
+import subprocess
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from .seed import zipf_weights
+
+encode_json = json.JSONEncoder().encode
+
+# relative frequency of each endpoint in the replayed traffic
+MIX = {
+    'index': 2,
+    'inventory': 2,
+    'purchases': 2,
+    'item': 4,
+    'search': 8,
+    'checkout': 2,
+}
+
+
+class TestClientTransport:
+    """Sends the requests to the application in process, counting their queries"""
+    def __init__(self, app):
+        from sqlalchemy import event
+        from server.models import db
+        self.client = app.test_client()
+        self.queries = 0
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self.count_query)
+
+    def count_query(self, *args):
+        self.queries += 1
+
+    def request(self, method: str, path: str, **kwargs) -> tuple:
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HttpTransport:
+    """Sends the requests to a running server, queries can't be counted"""
+    queries = None
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method: str, path: str, data=None, json=None, headers=None) -> tuple:
+        headers = dict(headers or {})
+        body = None
+        if json is not None:
+            body = encode_json(json).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request = Request(self.url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request) as response:
+                return response.status, response.read().decode()
+        except HTTPError as e:
+            return e.code, e.read().decode()
+
+
+def csrf_token(page: str) -> str:
+    match = re.search(r"csrf_token: '([0-9a-f]*)'", page)
+    return match.group(1) if match else ''
+
+def percentile(values: list, percent: float) -> float:
+    values = sorted(values)
+    index = min(int(round(percent / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+def login(transport, username: str, password: str) -> str:
+    """Logs in and gets the CSRF token of the session
+    Returns
+    -------
+    str
+        the token sent with the API requests
+    """
+    transport.request('GET', '/login')
+    status, page = transport.request('GET', '/login')
+    transport.request('POST', '/login', data={
+        'username': username, 'password': password, 'csrf_token': csrf_token(page)})
+    status, page = transport.request('GET', '/')
+    if status != 200:
+        raise RuntimeError(f'Could not log in as {username}')
+    return csrf_token(page)
+
+def load_catalog(app) -> tuple:
+    """Gets the item ids and names the requests are made with
+    Returns
+    -------
+    tuple
+        the item ids, most sold first, and their names
+    """
+    from server.models import Item
+    with app.app_context():
+        rows = Item.query.with_entities(Item.id, Item.name) \
+            .order_by(Item.balance_sold.desc(), Item.id).all()
+    return [x.id for x in rows], [x.name for x in rows]
+
+def run(transport, item_ids: list, names: list, requests: int,
+        username: str, password: str, seed: int = 0) -> dict:
+    """Replays the endpoint mix and measures every request
+    Parameters
+    ----------
+    transport: TestClientTransport | HttpTransport
+        sends the requests
+    item_ids: list
+        the item ids, most sold first
+    names: list
+        the names of the items
+    requests: int
+        the number of measured requests
+    username: str
+        the user the requests are made as
+    password: str
+        the password of the user
+    seed: int
+        the seed of the random generator
+    Returns
+    -------
+    dict
+        the latency percentiles, throughput, queries per request and
+        status codes of each endpoint
+    """
+    rng = random.Random(seed)
+    weights = zipf_weights(len(item_ids), 1.1)
+    token = login(transport, username, password)
+
+    def pick_item() -> int:
+        rank = bisect.bisect(weights, rng.random() * weights[-1])
+        return item_ids[min(rank, len(item_ids) - 1)]
+
+    def build(name: str) -> tuple:
+        if name == 'index':
+            return 'GET', '/', {}
+        if name == 'inventory':
+            return 'GET', '/inventory', {}
+        if name == 'purchases':
+            return 'GET', '/purchase', {}
+        if name == 'item':
+            return 'GET', f'/item/{pick_item()}', {}
+        if name == 'search':
+            term = rng.choice(names).split()[rng.randrange(2)][:rng.randint(2, 5)]
+            return 'GET', '/api/v1/search/item?' + urlencode({'search': term}), {}
+        return 'POST', '/api/v1/purchase', {
+            'json': {'items': [{'id': pick_item(), 'quantity': 1}]},
+            'headers': {'X-CSRF-Token': token},
+        }
+
+    names_mix, counts = zip(*MIX.items())
+    samples = {name: {'latency': [], 'queries': [], 'status': {}} for name in MIX}
+    started = time.perf_counter()
+    for name in rng.choices(names_mix, counts, k=requests):
+        method, path, kwargs = build(name)
+        queries = transport.queries
+        begin = time.perf_counter()
+        status, _ = transport.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - begin
+        sample = samples[name]
+        sample['latency'].append(elapsed * 1000)
+        if queries is not None:
+            sample['queries'].append(transport.queries - queries)
+        sample['status'][str(status)] = sample['status'].get(str(status), 0) + 1
+    duration = time.perf_counter() - started
+
+    endpoints = {}
+    for name, sample in samples.items():
+        latency = sample['latency']
+        if not latency:
+            continue
+        endpoints[name] = {
+            'requests': len(latency),
+            'p50_ms': round(percentile(latency, 50), 3),
+            'p95_ms': round(percentile(latency, 95), 3),
+            'p99_ms': round(percentile(latency, 99), 3),
+            'queries_per_request': round(statistics.mean(sample['queries']), 2)
+            if sample['queries'] else None,
+            'status': sample['status'],
+        }
+    all_latency = [x for sample in samples.values() for x in sample['latency']]
+    return {
+        'requests': requests,
+        'seconds': round(duration, 3),
+        'throughput_rps': round(requests / duration, 1),
+        'p50_ms': round(percentile(all_latency, 50), 3),
+        'p95_ms': round(percentile(all_latency, 95), 3),
+        'p99_ms': round(percentile(all_latency, 99), 3),
+        'endpoints': endpoints,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == '__main__':
+    import os
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--url', help='benchmark a running server instead of the test client')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    from server import create_app
+    app = create_app()
+    item_ids, names = load_catalog(app)
+    username = os.getenv('ADMIN_USERNAME', 'admin')
+    password = os.getenv('ADMIN_PASSWORD', 'admin')
+    transport = HttpTransport(args.url) if args.url else TestClientTransport(app)
+    if args.warmup:
+        run(transport, item_ids, names, args.warmup, username, password, args.seed + 1)
+    report = {
+        'commit': git_commit(),
+        'target': args.url or 'test_client',
+        **run(transport, item_ids, names, args.requests, username, password, args.seed),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
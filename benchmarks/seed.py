@@ -0,0 +1,203 @@
+"""Fills the configured database with synthetic items, stock and purchases
+
+Item popularity follows a Zipf distribution so a few items get most of the
+sales, like a real store. The database must be migrated and should be a
+throwaway one, select it with CONFIG_TYPE / DATABASE_URI.
+
+Usage: python -m benchmarks.seed [--items 1000] [--stocks 5000] [--purchases 20000]
+"""
+import argparse
+import bisect
+import itertools
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+BRANDS = ('Acme', 'Zig', 'Nova', 'Luz', 'Mabuhay', 'Pacific', 'Sari', 'Bayan')
+PRODUCTS = ('Rice', 'Soap', 'Noodles', 'Coffee', 'Sardines', 'Biscuits', 'Soda',
+            'Shampoo', 'Vinegar', 'Candles', 'Batteries', 'Matches', 'Bread')
+SIZES = ('Small', 'Medium', 'Large', '250g', '500g', '1kg', '1L', 'Pack')
+CHUNK_SIZE = 5000
+
+def zipf_weights(count: int, skew: float) -> list:
+    """Cumulative Zipf weights of the ranks 1 to count
+    Parameters
+    ----------
+    count: int
+        the number of ranks
+    skew: float
+        the exponent, higher values concentrate the weight on the first ranks
+    Returns
+    -------
+    list
+        the cumulative weights, usable as cum_weights of random.choices
+    """
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+def generate(items: int, stocks: int, purchases: int, skew: float = 1.1,
+             days: int = 365, seed: int = 0) -> dict:
+    """Generates the rows of a synthetic store
+    Parameters
+    ----------
+    items: int
+        the number of items
+    stocks: int
+        the number of stock entries, at least one per sold item
+    purchases: int
+        the number of purchases
+    skew: float
+        the Zipf exponent of the item popularity
+    days: int
+        the number of days the history is spread over
+    seed: int
+        the seed of the random generator
+    Returns
+    -------
+    dict
+        the rows keyed by table name
+    """
+    rng = random.Random(seed)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=days)
+    span = days * 24 * 60 * 60
+    item_rows = [{
+        'id': i,
+        'bar_code': f'{480000000000 + i:013d}',
+        'name': f'{rng.choice(BRANDS)} {rng.choice(PRODUCTS)} {rng.choice(SIZES)} {i}',
+        'price': round(rng.uniform(5, 500), 2),
+        'added_on': start,
+    } for i in range(1, items + 1)]
+    # the popularity rank of an item is unrelated to its id
+    ranked = [row['id'] for row in item_rows]
+    rng.shuffle(ranked)
+    weights = zipf_weights(items, skew)
+    total_weight = weights[-1]
+
+    purchase_rows, line_rows = [], []
+    sold = defaultdict(int)
+    sales = defaultdict(lambda: [0, 0.0])
+    offsets = sorted(rng.randrange(span) for _ in range(purchases))
+    for purchase_id, offset in enumerate(offsets, 1):
+        added_on = start + timedelta(seconds=offset)
+        lines = {}
+        for _ in range(rng.choice((1, 1, 2, 2, 3, 4, 5))):
+            rank = bisect.bisect(weights, rng.random() * total_weight)
+            lines[ranked[min(rank, items - 1)]] = rng.choice((1, 1, 1, 2, 3))
+        total = 0.0
+        for item_id, quantity in lines.items():
+            price = item_rows[item_id - 1]['price']
+            line_total = round(price * quantity, 2)
+            total += line_total
+            sold[item_id] += quantity
+            day_sales = sales[(item_id, added_on.date())]
+            day_sales[0] += quantity
+            day_sales[1] += line_total
+            line_rows.append({
+                'item_id': item_id, 'purchase_id': purchase_id, 'price': price,
+                'discount': 0, 'quantity': quantity, 'total': line_total,
+                'name': item_rows[item_id - 1]['name'],
+                'bar_code': item_rows[item_id - 1]['bar_code'],
+            })
+        purchase_rows.append({
+            'id': purchase_id, 'reference_id': '%032x' % rng.getrandbits(128),
+            'discount': 0, 'total': round(total, 2), 'added_on': added_on,
+        })
+
+    # restock popular items more often, and always enough to cover their sales
+    entries = defaultdict(int)
+    for item_id in sold:
+        entries[item_id] = 1
+    for _ in range(max(stocks - len(entries), 0)):
+        rank = bisect.bisect(weights, rng.random() * total_weight)
+        entries[ranked[min(rank, items - 1)]] += 1
+    stock_rows = []
+    for item_id, count in entries.items():
+        base, extra = divmod(sold[item_id] + rng.randint(5, 50), count)
+        for n in range(count):
+            quantity = max(base + (n < extra), 1)
+            per_item_cost = round(item_rows[item_id - 1]['price'] * rng.uniform(0.5, 0.8), 2)
+            stock_rows.append({
+                'item_id': item_id, 'quantity': quantity,
+                'per_item_cost': per_item_cost, 'cost': round(per_item_cost * quantity, 2),
+                'added_on': start + timedelta(seconds=rng.randrange(span)),
+            })
+
+    stocked = defaultdict(lambda: [0, 0.0])
+    for row in stock_rows:
+        stocked[row['item_id']][0] += row['quantity']
+        stocked[row['item_id']][1] += row['cost']
+    revenue = defaultdict(float)
+    for (item_id, _), (_, day_revenue) in sales.items():
+        revenue[item_id] += day_revenue
+    for row in item_rows:
+        row.update({
+            'balance_stocked': stocked[row['id']][0],
+            'balance_cost': stocked[row['id']][1],
+            'balance_sold': sold[row['id']],
+            'balance_revenue': revenue[row['id']],
+            'balance_on_hand': stocked[row['id']][0] - sold[row['id']],
+        })
+    sales_rows = [{'item_id': item_id, 'day': day, 'quantity': quantity, 'revenue': day_revenue}
+                  for (item_id, day), (quantity, day_revenue) in sales.items()]
+    return {
+        'item': item_rows,
+        'stock': stock_rows,
+        'purchase': purchase_rows,
+        'item_purchase': line_rows,
+        'sales_daily': sales_rows,
+    }
+
+def seed(items: int, stocks: int, purchases: int, skew: float = 1.1, seed: int = 0) -> dict:
+    """Inserts a synthetic store into the empty tables of the database
+    Parameters
+    ----------
+    items: int
+        the number of items
+    stocks: int
+        the number of stock entries
+    purchases: int
+        the number of purchases
+    skew: float
+        the Zipf exponent of the item popularity
+    seed: int
+        the seed of the random generator
+    Returns
+    -------
+    dict
+        the number of inserted rows of each table and the elapsed seconds
+    """
+    from server.models import db
+    rows = generate(items, stocks, purchases, skew, seed=seed)
+    started = time.perf_counter()
+    with db.engine.begin() as connection:
+        for name in rows:
+            table = db.metadata.tables[name]
+            if connection.execute(table.select().limit(1)).first() is not None:
+                raise RuntimeError(f'{name} is not empty, seed a fresh database')
+        for name, table_rows in rows.items():
+            table = db.metadata.tables[name]
+            for i in range(0, len(table_rows), CHUNK_SIZE):
+                connection.execute(table.insert(), table_rows[i:i + CHUNK_SIZE])
+        if connection.dialect.name == 'postgresql':
+            # the ids were given explicitly, move the sequences past them
+            for name in ('item', 'stock', 'purchase'):
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                    f"(SELECT max(id) FROM {name}))")
+    result = {name: len(table_rows) for name, table_rows in rows.items()}
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--stocks', type=int, default=5000)
+    parser.add_argument('--purchases', type=int, default=20000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from server import create_app
+    with create_app().app_context():
+        print(json.dumps(seed(args.items, args.stocks, args.purchases, args.skew, args.seed), indent=2))
@@ -0,0 +1,49 @@
+"""Compares the size and speed of the session serializers
+
+Usage: python -m benchmarks.session_serializer [--number 100000]
+"""
+import argparse
+import json
+import timeit
+from uuid import uuid4
+
+from server.plugins.flask_session.serializers import serializers
+
+SESSIONS = {
+    'anonymous': {'csrftoken': uuid4().hex},
+    'signed_in': {'signed_in': True, 'user_id': 1, 'csrftoken': uuid4().hex},
+    'flashes': {'signed_in': True, 'user_id': 1, 'csrftoken': uuid4().hex,
+                '_flashes': [('message', 'Item saved')]},
+}
+
+def run(number: int) -> dict:
+    """Measures every serializer with every sample session
+    Parameters
+    ----------
+    number: int
+        the number of times each operation is repeated
+    Returns
+    -------
+    dict
+        the bytes per session and the microseconds per dump and load
+    """
+    results = {}
+    for name, serializer_class in serializers.items():
+        serializer = serializer_class()
+        for session_name, data in SESSIONS.items():
+            payload = serializer.dumps(data)
+            assert serializer.loads(payload) == data
+            dump = timeit.timeit(lambda: serializer.dumps(data), number=number)
+            load = timeit.timeit(lambda: serializer.loads(payload), number=number)
+            results[f'{name}/{session_name}'] = {
+                'bytes': len(payload),
+                'dump_us': round(dump / number * 1e6, 3),
+                'load_us': round(load / number * 1e6, 3),
+            }
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.number), indent=2))
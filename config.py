@@ -2,20 +2,79 @@ import os
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+def engine_options(database_uri: str) -> dict:
+    "Pool settings of the database engine, gunicorn.conf.py sizes them per profile"
+    if database_uri.startswith('sqlite'):
+        if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        # keep the SQLite connections open so their pragmas and page cache are
+        # reused, the pool hands each one to a single thread at a time
+        from sqlalchemy.pool import QueuePool
+        return {
+            'poolclass': QueuePool,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'connect_args': {'check_same_thread': False},
+        }
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_pre_ping': True,
+    }
+
 class Config:
     FLASK_ENV = 'development'
     DEBUG = False
     TESTING = False
     CSRF_ENABLED = True
+    CSRF_TOKEN_MODE = 'hmac'
+    CSRF_TIME_LIMIT = 3600
     SECRET_KEY = os.getenv('SECRET_KEY', 'MEOWMEOW')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     SESSION_TYPE = 'sqlalchemy'
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
+    SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', 0))
+    SESSION_SERIALIZER = os.getenv('SESSION_SERIALIZER', 'pickle')
+    SESSION_CACHE_SIZE = 1024
+    SESSION_CACHE_TTL = 5
+    ITEM_SEARCH_BACKEND = os.getenv('ITEM_SEARCH_BACKEND', 'auto')
+    BARCODE_CACHE_SIZE = 4096
+    BARCODE_CACHE_TTL = 60
+    RECEIPT_CACHE_SIZE = 512
+    RECEIPT_CACHE_TTL = 3600
+    LAST_ACCESS_INTERVAL = int(os.getenv('LAST_ACCESS_INTERVAL', 300))
+    LAST_ACCESS_CACHE_SIZE = 4096
+    USER_CACHE_SIZE = 256
+    USER_CACHE_TTL = 30
+    SQL_PROFILE_SAMPLE_RATE = float(os.getenv('SQL_PROFILE_SAMPLE_RATE', 0.05))
+    LOG_FILE = os.getenv('LOG_FILE', 'flaskserver.log')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 20))
+    SQL_PROFILE_SLOW_REQUEST_MS = 250
+    SQL_PROFILE_SLOW_QUERY_MS = 100
+    SQL_PROFILE_REPEAT_THRESHOLD = 5
+    # applied to every new SQLite connection, ignored by other databases
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16000,
+        'temp_store': 'MEMORY',
+    }
+    SQLITE_MAINTENANCE_INTERVAL = int(os.getenv('SQLITE_MAINTENANCE_INTERVAL', 0))
+    # read-only views and API GETs read from the replica when DATABASE_REPLICA_URI
+    # is set, clients that wrote stay on the primary for REPLICA_STICKY_SECONDS
+    SQLALCHEMY_BINDS = {'replica': os.getenv('DATABASE_REPLICA_URI')} if os.getenv('DATABASE_REPLICA_URI') else {}
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SQL_PROFILE_SAMPLE_RATE = float(os.getenv('SQL_PROFILE_SAMPLE_RATE', 1.0))
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(basedir, 'dev.db')
 
 class TestingConfig(Config):
@@ -24,4 +83,7 @@ class TestingConfig(Config):
 
 class ProductionConfig(Config):
     FLASK_ENV = 'production'
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI') or "sqlite:///" + os.path.join(basedir, 'prod.db')
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI') or "sqlite:///" + os.path.join(basedir, 'prod.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', 6 * 60 * 60))
+    SQLITE_MAINTENANCE_INTERVAL = int(os.getenv('SQLITE_MAINTENANCE_INTERVAL', 10 * 60))
\ No newline at end of file
@@ -1,3 +1,4 @@
+import gc
 import multiprocessing
 import os
 from dotenv import load_dotenv
@@ -9,4 +10,80 @@ for env_file in ('.env', '.flaskenv'):
 
 wsgi_app = 'app:app'
 bind = os.getenv('BIND_ADDRESS', '127.0.0.1:3000')
-workers = multiprocessing.cpu_count() * 2 + 1
\ No newline at end of file
+
+# Deployment profiles selected with GUNICORN_PROFILE. Each one sizes the
+# workers, their concurrency and the database pool of every worker together:
+#   sync     one request at a time per process
+#   gthread  fewer processes running several request threads each
+#   gevent   cooperative greenlets, for slow clients (needs gevent installed)
+cpus = multiprocessing.cpu_count()
+profile = os.getenv('GUNICORN_PROFILE', 'sync')
+PROFILES = {
+    'sync': {'worker_class': 'sync', 'workers': cpus * 2 + 1, 'threads': 1, 'pool_size': 1},
+    'gthread': {'worker_class': 'gthread', 'workers': cpus + 1, 'threads': 4, 'pool_size': 4},
+    'gevent': {'worker_class': 'gevent', 'workers': cpus, 'threads': 1, 'pool_size': 10,
+               'worker_connections': 100},
+}
+if profile not in PROFILES:
+    raise RuntimeError(f'Unknown GUNICORN_PROFILE {profile!r}, use one of {", ".join(PROFILES)}')
+settings = PROFILES[profile]
+if profile == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        raise RuntimeError('The gevent profile needs gevent, install it with "pip install gevent"')
+
+database_uri = os.getenv('DATABASE_URI') or 'sqlite://'
+if database_uri.startswith('sqlite'):
+    # SQLite has a single writer, more processes only queue on its lock
+    settings['workers'] = min(settings['workers'], 4)
+
+worker_class = settings['worker_class']
+workers = int(os.getenv('WEB_CONCURRENCY', settings['workers']))
+threads = int(os.getenv('GUNICORN_THREADS', settings['threads']))
+worker_connections = settings.get('worker_connections', 1000)
+
+# read by config.ProductionConfig when the workers load the application. Every
+# request thread holds a connection and one more is kept for the in-process
+# writes around the requests, the background tasks of each worker (session
+# sweeper, SQLite maintenance) take theirs from the overflow
+background_tasks = 2
+os.environ.setdefault('DB_POOL_SIZE', str(max(settings['pool_size'], threads) + 1))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(background_tasks if profile != 'gevent' else settings['pool_size']))
+
+# workers share the preloaded application copy-on-write, gevent must patch
+# the standard library before the application is imported so it loads per worker
+preload_app = profile != 'gevent'
+if preload_app:
+    # the master owns the log file, its queue must exist before the application
+    # is preloaded so the workers inherit it instead of one only the master reads
+    from server.logs import share_log_queue
+    share_log_queue()
+
+
+def on_starting(server):
+    # workers send their records to the shared queue, the master writes them
+    from server.logs import start_log_listener
+    start_log_listener(shared=True)
+
+
+def pre_fork(server, worker):
+    # keep the preloaded objects out of the collector so it doesn't touch
+    # and copy their pages in every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # connections opened by the master must not be shared with the workers
+    from server import db
+    app = server.app.wsgi()
+    with app.app_context():
+        for bind in [None, *(app.config.get('SQLALCHEMY_BINDS') or {})]:
+            db.get_engine(app, bind=bind).dispose(close=False)
+
+
+def on_exit(server):
+    from server.logs import stop_log_listener
+    stop_log_listener()
@@ -0,0 +1,43 @@
+"""Added item stock balances
+
+Revision ID: 3c9d1e7a5b42
+Revises: f51ffa710bc5
+Create Date: 2026-10-18 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d1e7a5b42'
+down_revision = 'f51ffa710bc5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('item', sa.Column('balance_on_hand', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('item', sa.Column('balance_stocked', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('item', sa.Column('balance_sold', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('item', sa.Column('balance_cost', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('item', sa.Column('balance_revenue', sa.Float(), nullable=False, server_default='0'))
+    # seed the balances from the existing stock and purchase history
+    op.execute(
+        'UPDATE item SET '
+        'balance_stocked = COALESCE((SELECT SUM(stock.quantity) FROM stock WHERE stock.item_id = item.id), 0), '
+        'balance_cost = COALESCE((SELECT SUM(stock.cost) FROM stock WHERE stock.item_id = item.id), 0), '
+        'balance_sold = COALESCE((SELECT SUM(item_purchase.quantity) FROM item_purchase '
+        'WHERE item_purchase.item_id = item.id), 0), '
+        'balance_revenue = COALESCE((SELECT SUM(item_purchase.total) FROM item_purchase '
+        'WHERE item_purchase.item_id = item.id), 0)'
+    )
+    op.execute('UPDATE item SET balance_on_hand = balance_stocked - balance_sold')
+
+
+def downgrade():
+    op.drop_column('item', 'balance_revenue')
+    op.drop_column('item', 'balance_cost')
+    op.drop_column('item', 'balance_sold')
+    op.drop_column('item', 'balance_stocked')
+    op.drop_column('item', 'balance_on_hand')
@@ -0,0 +1,66 @@
+"""Added item search indexes
+
+Revision ID: 8e4f2a91c6d0
+Revises: 3c9d1e7a5b42
+Create Date: 2026-10-18 11:40:02.553817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f2a91c6d0'
+down_revision = '3c9d1e7a5b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        if not bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar():
+            return
+        # external content table, the triggers keep it in sync with the item table
+        op.execute(
+            "CREATE VIRTUAL TABLE item_fts USING fts5("
+            "name, bar_code, content='item', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            "CREATE TRIGGER item_fts_insert AFTER INSERT ON item BEGIN "
+            "INSERT INTO item_fts(rowid, name, bar_code) VALUES (new.id, new.name, new.bar_code); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER item_fts_delete AFTER DELETE ON item BEGIN "
+            "INSERT INTO item_fts(item_fts, rowid, name, bar_code) "
+            "VALUES ('delete', old.id, old.name, old.bar_code); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER item_fts_update AFTER UPDATE OF name, bar_code ON item BEGIN "
+            "INSERT INTO item_fts(item_fts, rowid, name, bar_code) "
+            "VALUES ('delete', old.id, old.name, old.bar_code); "
+            "INSERT INTO item_fts(rowid, name, bar_code) VALUES (new.id, new.name, new.bar_code); "
+            "END"
+        )
+        op.execute("INSERT INTO item_fts(item_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_item_name_trgm', 'item', ['name'], postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'})
+        op.create_index('ix_item_bar_code_trgm', 'item', ['bar_code'], postgresql_using='gin',
+                        postgresql_ops={'bar_code': 'gin_trgm_ops'})
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS item_fts_update')
+        op.execute('DROP TRIGGER IF EXISTS item_fts_delete')
+        op.execute('DROP TRIGGER IF EXISTS item_fts_insert')
+        op.execute('DROP TABLE IF EXISTS item_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.drop_index('ix_item_bar_code_trgm', table_name='item')
+        op.drop_index('ix_item_name_trgm', table_name='item')
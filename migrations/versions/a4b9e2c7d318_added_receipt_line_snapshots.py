@@ -0,0 +1,33 @@
+"""Added receipt line snapshots
+
+Revision ID: a4b9e2c7d318
+Revises: f2a7c9d4e815
+Create Date: 2026-10-18 16:40:12.318064
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4b9e2c7d318'
+down_revision = 'f2a7c9d4e815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # receipts keep the name and bar code the item had when it was sold
+    op.add_column('item_purchase', sa.Column('name', sa.String(length=200), nullable=True))
+    op.add_column('item_purchase', sa.Column('bar_code', sa.String(length=128), nullable=True))
+    op.execute(
+        'UPDATE item_purchase SET '
+        'name = (SELECT item.name FROM item WHERE item.id = item_purchase.item_id), '
+        'bar_code = (SELECT item.bar_code FROM item WHERE item.id = item_purchase.item_id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('item_purchase') as batch_op:
+        batch_op.drop_column('bar_code')
+        batch_op.drop_column('name')
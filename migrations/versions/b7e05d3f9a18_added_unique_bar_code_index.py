@@ -0,0 +1,40 @@
+"""Added unique bar code index
+
+Revision ID: b7e05d3f9a18
+Revises: 8e4f2a91c6d0
+Create Date: 2026-10-18 12:26:51.904122
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e05d3f9a18'
+down_revision = '8e4f2a91c6d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # new bar codes are stored trimmed and blank ones as null, the existing
+    # ones are brought in line so they match exactly and clash when they repeat
+    op.execute("UPDATE item SET bar_code = NULLIF(TRIM(bar_code), '')")
+    # which duplicate keeps the bar code is for the owner of the data to decide,
+    # so list them instead of failing on the index with the first one
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT bar_code, id, name FROM item WHERE bar_code IN '
+        '(SELECT bar_code FROM item WHERE bar_code IS NOT NULL '
+        'GROUP BY bar_code HAVING COUNT(*) > 1) ORDER BY bar_code, id'
+    )).fetchall()
+    if duplicates:
+        lines = '\n'.join(f'  {bar_code!r}: item {id} {name!r}' for bar_code, id, name in duplicates)
+        raise RuntimeError(
+            'Bar codes must be unique, change or clear the bar codes of these items '
+            f'and run the upgrade again:\n{lines}'
+        )
+    op.create_index(op.f('ix_item_bar_code'), 'item', ['bar_code'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_item_bar_code'), table_name='item')
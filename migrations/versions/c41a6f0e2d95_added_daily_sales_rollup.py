@@ -0,0 +1,38 @@
+"""Added daily sales rollup
+
+Revision ID: c41a6f0e2d95
+Revises: b7e05d3f9a18
+Create Date: 2026-10-18 13:05:17.226490
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a6f0e2d95'
+down_revision = 'b7e05d3f9a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_daily',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.PrimaryKeyConstraint('item_id', 'day')
+    )
+    op.execute(
+        'INSERT INTO sales_daily (item_id, day, quantity, revenue) '
+        'SELECT item_purchase.item_id, DATE(purchase.added_on), '
+        'SUM(item_purchase.quantity), SUM(item_purchase.total) '
+        'FROM item_purchase JOIN purchase ON purchase.id = item_purchase.purchase_id '
+        'GROUP BY item_purchase.item_id, DATE(purchase.added_on)'
+    )
+
+
+def downgrade():
+    op.drop_table('sales_daily')
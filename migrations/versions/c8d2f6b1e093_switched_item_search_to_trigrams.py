@@ -0,0 +1,68 @@
+"""Switched item search to trigrams
+
+Revision ID: c8d2f6b1e093
+Revises: a4b9e2c7d318
+Create Date: 2026-10-18 17:21:09.640215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d2f6b1e093'
+down_revision = 'a4b9e2c7d318'
+branch_labels = None
+depends_on = None
+
+
+def create_item_fts(tokenize):
+    op.execute('DROP TRIGGER IF EXISTS item_fts_update')
+    op.execute('DROP TRIGGER IF EXISTS item_fts_delete')
+    op.execute('DROP TRIGGER IF EXISTS item_fts_insert')
+    op.execute('DROP TABLE IF EXISTS item_fts')
+    op.execute(
+        "CREATE VIRTUAL TABLE item_fts USING fts5("
+        f"name, bar_code, content='item', content_rowid='id', {tokenize})"
+    )
+    op.execute(
+        "CREATE TRIGGER item_fts_insert AFTER INSERT ON item BEGIN "
+        "INSERT INTO item_fts(rowid, name, bar_code) VALUES (new.id, new.name, new.bar_code); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER item_fts_delete AFTER DELETE ON item BEGIN "
+        "INSERT INTO item_fts(item_fts, rowid, name, bar_code) "
+        "VALUES ('delete', old.id, old.name, old.bar_code); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER item_fts_update AFTER UPDATE OF name, bar_code ON item BEGIN "
+        "INSERT INTO item_fts(item_fts, rowid, name, bar_code) "
+        "VALUES ('delete', old.id, old.name, old.bar_code); "
+        "INSERT INTO item_fts(rowid, name, bar_code) VALUES (new.id, new.name, new.bar_code); "
+        "END"
+    )
+    op.execute("INSERT INTO item_fts(item_fts) VALUES ('rebuild')")
+
+
+def has_item_fts(bind):
+    return bind.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_fts'").first() is not None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # the trigram tokenizer (SQLite 3.34) matches substrings like LIKE and pg_trgm,
+    # older versions keep the word prefix index and the search falls back to LIKE
+    if bind.dialect.name != 'sqlite' or not has_item_fts(bind) \
+            or bind.dialect.dbapi.sqlite_version_info < (3, 34, 0):
+        return
+    create_item_fts("tokenize='trigram'")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite' or not has_item_fts(bind):
+        return
+    create_item_fts("tokenize='unicode61 remove_diacritics 2', prefix='2 3'")
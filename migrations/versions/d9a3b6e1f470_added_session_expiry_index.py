@@ -0,0 +1,24 @@
+"""Added session expiry index
+
+Revision ID: d9a3b6e1f470
+Revises: c41a6f0e2d95
+Create Date: 2026-10-18 14:02:38.671054
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a3b6e1f470'
+down_revision = 'c41a6f0e2d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_sessions_expiry'), 'sessions', ['expiry'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_sessions_expiry'), table_name='sessions')
@@ -0,0 +1,34 @@
+"""Added listing indexes
+
+Revision ID: e6c1f8a2b3d7
+Revises: d9a3b6e1f470
+Create Date: 2026-10-18 15:27:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c1f8a2b3d7'
+down_revision = 'd9a3b6e1f470'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_item_name', 'item', ['name', 'id'], unique=False)
+    op.create_index('ix_stock_added_on', 'stock', ['added_on', 'id'], unique=False)
+    op.create_index('ix_stock_item_id_added_on', 'stock', ['item_id', 'added_on', 'id'], unique=False)
+    op.create_index('ix_purchase_added_on', 'purchase', ['added_on', 'id'], unique=False)
+    op.create_index(op.f('ix_purchase_reference_id'), 'purchase', ['reference_id'], unique=False)
+    op.create_index(op.f('ix_item_purchase_purchase_id'), 'item_purchase', ['purchase_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_item_purchase_purchase_id'), table_name='item_purchase')
+    op.drop_index(op.f('ix_purchase_reference_id'), table_name='purchase')
+    op.drop_index('ix_purchase_added_on', table_name='purchase')
+    op.drop_index('ix_stock_item_id_added_on', table_name='stock')
+    op.drop_index('ix_stock_added_on', table_name='stock')
+    op.drop_index('ix_item_name', table_name='item')
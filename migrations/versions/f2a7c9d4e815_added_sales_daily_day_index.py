@@ -0,0 +1,24 @@
+"""Added sales_daily day index
+
+Revision ID: f2a7c9d4e815
+Revises: e6c1f8a2b3d7
+Create Date: 2026-10-18 16:02:41.530217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a7c9d4e815'
+down_revision = 'e6c1f8a2b3d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_sales_daily_day', 'sales_daily', ['day', 'item_id', 'quantity', 'revenue'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sales_daily_day', table_name='sales_daily')
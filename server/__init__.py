@@ -1,29 +1,24 @@
 import os
 from flask import Flask
 from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
+from .plugins.replica import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 migrate = Migrate()
 
 def configure_logging(app: Flask) -> None:
-    """Initialize file logging
+    """Initialize file logging through the non-blocking log queue
     Parameters
     ----------
     app: Flask
         the flask application
     """
-    import logging
     from flask.logging import default_handler
-    from logging.handlers import RotatingFileHandler
+    from .logs import log_settings, queue_handler
+    settings = log_settings(app.config)
     app.logger.removeHandler(default_handler)
-    file_handler = RotatingFileHandler('flaskserver.log', maxBytes=16384, backupCount=20)
-
-    file_handler.setLevel(logging.INFO)
-    file_formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(filename)s: %(lineno)d]')
-    file_handler.setFormatter(file_formatter)
-
-    app.logger.addHandler(file_handler)
+    app.logger.setLevel(settings['level'])
+    app.logger.addHandler(queue_handler(settings))
 
 def create_app() -> Flask:
     "Creates the application and binds its necessary dependencies"
@@ -34,6 +29,7 @@ def create_app() -> Flask:
     init_plugins(app)
     register_app_events(app)
     register_blueprints(app)
+    register_commands(app)
     return app
 
 def init_db(app: Flask) -> None:
@@ -44,8 +40,13 @@ def init_db(app: Flask) -> None:
         the flask application
     """
     from . import models
+    from .plugins.replica import REPLICA_BIND, has_replica
+    from .plugins.sqlite_pragmas import init_sqlite
     db.init_app(app)
     migrate.init_app(app, db)
+    init_sqlite(app, db.get_engine(app))
+    if has_replica(app):
+        init_sqlite(app, db.get_engine(app, bind=REPLICA_BIND), read_only=True)
 
 def init_plugins(app: Flask) -> None:
     """Initializes and binds the plugins in the flask application
@@ -54,15 +55,29 @@ def init_plugins(app: Flask) -> None:
     app: Flask
         the flask application
     """
+    from .plugins.barcode import init_barcode_cache
+    from .plugins.receipts import init_receipt_cache
     from .plugins.currency import format_currency
     from .plugins.flask_session import Session
     from .plugins.csrf import CSRFProtect
+    from .plugins.last_access import LastAccessTracker
+    from .plugins.login_manager import init_user_cache
+    from .plugins.session_sweeper import init_session_sweeper
     from .plugins.momentjs import momentjs
+    from .plugins.query_profiler import QueryProfiler
+    from .plugins.replica import init_replica
     app.config['SESSION_SQLALCHEMY'] = db
     app.jinja_env.globals['momentjs'] = momentjs
     app.jinja_env.globals['format_currency'] = format_currency
+    QueryProfiler(app)
+    init_replica(app)
     Session(app)
+    init_session_sweeper(app)
     CSRFProtect(app)
+    LastAccessTracker(app)
+    init_barcode_cache(app)
+    init_receipt_cache(app)
+    init_user_cache(app)
 
 def register_blueprints(app: Flask) -> None:
     """Bind blueprints to its respected paths
@@ -76,6 +91,21 @@ def register_blueprints(app: Flask) -> None:
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api/v1')
 
+def register_commands(app: Flask) -> None:
+    """Bind the command line interface commands to the application
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    """
+    from .commands import data_cli, queries_cli, replica_cli, sales_cli, sessions_cli, stock_cli
+    app.cli.add_command(stock_cli)
+    app.cli.add_command(sales_cli)
+    app.cli.add_command(sessions_cli)
+    app.cli.add_command(queries_cli)
+    app.cli.add_command(replica_cli)
+    app.cli.add_command(data_cli)
+
 def register_app_events(app: Flask) -> None:
     """Initialize global app events
     Parameters
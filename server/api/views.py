@@ -1,14 +1,20 @@
-from flask import g, request
+from flask import Response, g, request, stream_with_context, url_for
+from sqlalchemy.exc import IntegrityError
 
-from sqlalchemy import or_
-from server.models import db, Item, ItemPurchase, Purchase
+from server.models import db, CheckoutError, Item, ItemPurchase, Purchase
+from server.plugins import bulk
+from server.plugins.barcode import invalidate_barcodes, lookup_barcode
+from server.plugins.item_search import match_items
 from server.plugins.login_manager import login_required
+from server.plugins.pagination import cursor_args, paginate
+from server.plugins.replica import use_replica
 from . import bp
 
 @bp.before_request
 @login_required # set every api call to require a login
 def before_request():
-    pass
+    if request.method == 'GET':
+        use_replica()
 
 @bp.get('/item/<int:id>')
 def get_item(id: int):
@@ -19,6 +25,25 @@ def get_item(id: int):
     }
     return result
 
+@bp.get('/item/<int:id>/purchases')
+def get_item_purchases(id: int):
+    item = Item.query.get_or_404(id)
+    purchases = paginate(item.purchase_history(), (ItemPurchase.purchase_id.desc(),),
+                         20, **cursor_args())
+    result = [{
+        'id': x.id,
+        'quantity': x.quantity,
+        'total': x.total,
+        'added_on': x.added_on.strftime('%Y-%m-%dT%H:%M:%S Z'),
+        'url': url_for('main.receipt', id=x.id),
+    } for x in purchases]
+    return {
+        'success': True,
+        'result': result,
+        'has_next': purchases.has_next,
+        'next': purchases.next_cursor,
+    }
+
 @bp.post('/item')
 def add_item():
     data = request.json
@@ -27,7 +52,12 @@ def add_item():
     price = data.get('price')
     item = Item(name=name, price=price, bar_code=bar_code)
     db.session.add(item)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return {'success': False, 'error': 'duplicate_bar_code'}, 409
+    invalidate_barcodes(item.bar_code)
     result = {
         'success': True,
         'item': item.to_dict(),
@@ -40,52 +70,82 @@ def update_item(id: int):
     item = Item.query.get(id)
     if not item:
         return {'success': True, 'result': {}}
-    
-    for key, value in data.items():
-        if hasattr(item, key):
-            setattr(item, key, value)
-    
-    db.session.commit()
+
+    old_bar_code = item.bar_code
+    # only the details of the item can be edited, the balances follow the history
+    for key in ('bar_code', 'name', 'price'):
+        if key in data:
+            setattr(item, key, data[key])
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return {'success': False, 'error': 'duplicate_bar_code'}, 409
+    invalidate_barcodes(old_bar_code, item.bar_code)
     return {'success': True, 'result': item.to_dict()}
 
+@bp.delete('/item/<int:id>')
+def delete_item(id: int):
+    item = Item.query.get(id)
+    if not item:
+        return {'success': False, 'result': {}}, 404
+    bar_code = item.bar_code
+    db.session.delete(item)
+    db.session.commit()
+    invalidate_barcodes(bar_code)
+    return {'success': True, 'result': {'id': id}}
+
 @bp.get('/items')
 def get_items():
-    items = [x.to_dict() for x in Item.query.order_by(Item.name)]
+    items = Item.query.order_by(Item.name).all()
+    items = [{**x.to_dict(), 'stock': x.in_stock} for x in items]
     return {'success': True, 'items': items}
 
 @bp.post('/purchase')
 def purchase():
     data = request.json
-    purchased_items = []
-    grand_total = 0
-    # initialize purchase to avoid no purchase_id error for purchased items
-    purchase = Purchase(total=0)
-    for item in data.get('items', []):
-        qitem = Item.query.filter(Item.id==item['id']).first_or_404()
-        quantity = int(item['quantity'])
-        total = quantity * qitem.price
-        grand_total += total
-        purchased_items.append(
-            ItemPurchase(item=qitem, purchase=purchase, 
-                quantity=quantity, price=qitem.price, total=total)
-        )
-    purchase.total = grand_total
-    db.session.add(purchase)
+    lines = {}
+    errors = []
+    for index, item in enumerate(data.get('items', [])):
+        try:
+            item_id = int(item['id'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            errors.append({'line': index, 'error': 'invalid_line'})
+            continue
+        if quantity <= 0:
+            errors.append({'line': index, 'id': item_id, 'error': 'invalid_quantity'})
+            continue
+        # merge repeated items since an item can only appear once per purchase
+        lines[item_id] = lines.get(item_id, 0) + quantity
+    if not (lines or errors):
+        errors.append({'error': 'empty_cart'})
+    if errors:
+        return {'success': False, 'errors': errors}, 400
+
+    try:
+        purchase = Purchase.checkout(lines)
+    except CheckoutError as e:
+        db.session.rollback()
+        return {'success': False, 'errors': e.errors}, 409
     db.session.commit()
     return {
         'success': True,
         'result': {'id': purchase.id}
     }
 
+@bp.get('/scan/<bar_code>')
+def scan_item(bar_code: str):
+    item = lookup_barcode(bar_code)
+    if item is None:
+        return {'success': False, 'result': {}}, 404
+    return {'success': True, 'result': item}
+
 @bp.get('/search/item')
 def search_item():
     name = request.args.get('search', '')
-    try:
-        page = int(request.args.get('p', 1))
-    except ValueError:
-        page = 1
-    query = Item.query.filter(or_(Item.name.ilike(f'%{name}%'), Item.bar_code.ilike(f'%{name}%'))) \
-        .order_by(Item.name).paginate(page, 10)
+    query = paginate(*match_items(name), 10, **cursor_args())
     result = []
     for x in query.items:
         result.append({**x.to_dict(), 'stock': x.in_stock})
@@ -93,5 +153,36 @@ def search_item():
         'success': True,
         'result': result,
         'has_next': query.has_next,
+        'next': query.next_cursor,
     }
-    return context
\ No newline at end of file
+    return context
+
+@bp.post('/import/<any(items, stock):kind>')
+def import_records(kind: str):
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+        format = request.args.get('format') or bulk.guess_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        format = request.args.get('format') or bulk.guess_format(mimetype=request.mimetype)
+    if format not in bulk.FORMATS:
+        return {'success': False, 'errors': [{'error': 'invalid_format'}]}, 400
+    records = bulk.read_records(stream, format)
+    try:
+        report = bulk.import_items(records) if kind == 'items' else bulk.import_stock(records)
+    except bulk.ImportAborted as e:
+        # the batches before the failing one are committed
+        status = 409 if isinstance(e, bulk.ImportConflict) else 400
+        return {'success': False, 'result': e.report.to_dict(), 'errors': e.errors}, status
+    return {'success': True, 'result': report.to_dict()}
+
+@bp.get('/export/<any(items, stock, purchases):kind>')
+def export_records(kind: str):
+    format = request.args.get('format', 'csv')
+    if format not in bulk.FORMATS:
+        return {'success': False, 'errors': [{'error': 'invalid_format'}]}, 400
+    response = Response(stream_with_context(bulk.export_records(kind, format)),
+                        mimetype=bulk.MIMETYPES[format])
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{format}'
+    return response
@@ -0,0 +1,128 @@
+import click
+from flask.cli import AppGroup
+
+from server import db
+
+stock_cli = AppGroup('stock', help='Manage the stock balances of the items.')
+sales_cli = AppGroup('sales', help='Manage the daily sales rollup.')
+sessions_cli = AppGroup('sessions', help='Manage the server-side sessions.')
+queries_cli = AppGroup('queries', help='Inspect the queries of the application.')
+replica_cli = AppGroup('replica', help='Manage the read replica.')
+data_cli = AppGroup('data', help='Import and export the items, stock and purchases.')
+
+@stock_cli.command('reconcile')
+@click.option('--dry-run', is_flag=True, help='Only report the drift without fixing it.')
+def reconcile_stock(dry_run: bool):
+    """Rebuilds the item balances from the stock and purchase history"""
+    from .models import Item
+    from .models.item import BALANCE_COLUMNS
+    ledger = Item.ledger_balances()
+    current = db.session.query(Item.id, *(getattr(Item, x) for x in BALANCE_COLUMNS))
+    drifted = []
+    for item_id, *values in current:
+        expected = ledger[item_id]
+        drift = {
+            column: (value, expected[column])
+            for column, value in zip(BALANCE_COLUMNS, values)
+            if abs((value or 0) - expected[column]) > 1e-6
+        }
+        if not drift:
+            continue
+        drifted.append({'id': item_id, **expected})
+        changes = ', '.join(f'{column} {old} -> {new}' for column, (old, new) in drift.items())
+        click.echo(f'Item {item_id}: {changes}')
+    if drifted and not dry_run:
+        db.session.bulk_update_mappings(Item, drifted)
+        db.session.commit()
+    action = 'found' if dry_run else 'fixed'
+    click.echo(f'Checked {len(ledger)} items, {action} drift in {len(drifted)}.')
+
+@sales_cli.command('backfill')
+def backfill_sales():
+    """Rebuilds the daily sales rollup from the purchase history"""
+    from sqlalchemy import func, select
+    from .models import ItemPurchase, Purchase, SalesDaily
+    day = func.date(Purchase.added_on)
+    rollup = select(
+        ItemPurchase.item_id, day, func.sum(ItemPurchase.quantity), func.sum(ItemPurchase.total)
+    ).join(Purchase, Purchase.id == ItemPurchase.purchase_id).group_by(ItemPurchase.item_id, day)
+    table = SalesDaily.__table__
+    db.session.execute(table.delete())
+    db.session.execute(table.insert().from_select(
+        [table.c.item_id, table.c.day, table.c.quantity, table.c.revenue], rollup))
+    db.session.commit()
+    click.echo(f'Rebuilt {db.session.query(SalesDaily).count()} daily sales rows.')
+
+@sessions_cli.command('purge')
+@click.option('--batch-size', default=500, show_default=True, help='Sessions deleted per transaction.')
+def purge_expired_sessions(batch_size: int):
+    """Deletes the expired sessions"""
+    from flask import current_app
+    from .plugins.session_sweeper import purge_sessions
+    if not hasattr(current_app.session_interface, 'purge_expired'):
+        raise click.ClickException('The session backend does not store expired sessions.')
+    purged, elapsed = purge_sessions(batch_size)
+    click.echo(f'Purged {purged} expired sessions in {elapsed:.3f}s.')
+
+@queries_cli.command('check-plans')
+@click.option('--verbose', is_flag=True, help='Print the plan of every query.')
+def check_query_plans(verbose: bool):
+    """Explains the hot queries and fails when one reads a whole table"""
+    from .plugins.query_plans import check_plans
+    failed = []
+    for name, (plan, scans) in check_plans().items():
+        if scans:
+            failed.append(name)
+        if scans or verbose:
+            click.echo(f'{name}: {"FULL SCAN" if scans else "ok"}')
+            for line in plan:
+                click.echo(f'    {line}')
+    if failed:
+        raise click.ClickException(f'Full scans in {len(failed)} queries: {", ".join(failed)}')
+    click.echo('All hot queries use an index.')
+
+@replica_cli.command('sync')
+def sync_replica():
+    """Copies a SQLite primary into its replica file to try the routing locally"""
+    from flask import current_app
+    from .plugins.replica import REPLICA_BIND, has_replica, sync_sqlite_replica
+    if not has_replica(current_app):
+        raise click.ClickException('No replica configured, set DATABASE_REPLICA_URI')
+    try:
+        sync_sqlite_replica(current_app.config['SQLALCHEMY_DATABASE_URI'],
+                            current_app.config['SQLALCHEMY_BINDS'][REPLICA_BIND])
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo('Replica synced.')
+
+@data_cli.command('import')
+@click.argument('kind', type=click.Choice(('items', 'stock')))
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', type=click.Choice(('csv', 'jsonl')), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True, help='Records written per statement.')
+def import_data(kind: str, file, format: str, batch_size: int):
+    """Imports the items or stock entries of a CSV or JSON lines file, - for stdin"""
+    from .plugins import bulk
+    records = bulk.read_records(file, format or bulk.guess_format(file.name))
+    importer = bulk.import_items if kind == 'items' else bulk.import_stock
+    try:
+        report, conflicts = importer(records, batch_size), []
+    except bulk.ImportAborted as e:
+        report, conflicts = e.report, e.errors
+    for error in report.errors + conflicts:
+        click.echo(f'Line {error["line"]}: {error["error"]}', err=True)
+    if conflicts:
+        raise click.ClickException(f'Stopped at line {conflicts[0]["line"]} after inserting '
+                                   f'{report.inserted} and updating {report.updated}.')
+    click.echo(f'Inserted {report.inserted}, updated {report.updated}, rejected {report.failed}.')
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(('items', 'stock', 'purchases')))
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Defaults to stdout.')
+@click.option('--format', type=click.Choice(('csv', 'jsonl')), default='csv', show_default=True)
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per round trip.')
+def export_data(kind: str, output, format: str, batch_size: int):
+    """Writes the items, stock entries or purchased items as CSV or JSON lines"""
+    from .plugins import bulk
+    for chunk in bulk.export_records(kind, format, batch_size):
+        output.write(chunk)
@@ -0,0 +1,165 @@
+"""Logging pipeline writing the records of every process from a single thread
+
+Request threads only put their records on a queue, a QueueListener thread
+formats and writes them. Under gunicorn the listener runs in the master
+process (see gunicorn.conf.py) and the workers inherit its queue, so one
+writer per host owns the log file and its rotation.
+"""
+import atexit
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from werkzeug.utils import import_string
+
+_queue = None
+_listener = None
+_owner = None
+
+class JsonFormatter(logging.Formatter):
+    "Formats the records as single line JSON objects"
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'file': record.filename,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class RecordQueueHandler(QueueHandler):
+    "Puts the records on the queue with their message merged and exception as text"
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def log_settings(config=None) -> dict:
+    """Gets the logging settings of a configuration
+    Parameters
+    ----------
+    config: flask.Config, optional
+        the application config, defaults to the class named by CONFIG_TYPE
+    Returns
+    -------
+    dict
+        the LOG_* settings with their defaults
+    """
+    if config is None:
+        config_class = import_string(os.getenv('CONFIG_TYPE', 'config.DevelopmentConfig'))
+        config = {key: getattr(config_class, key) for key in dir(config_class) if key.startswith('LOG_')}
+    return {
+        'file': config.get('LOG_FILE', 'flaskserver.log'),
+        'level': config.get('LOG_LEVEL', 'INFO'),
+        'format': config.get('LOG_FORMAT', 'json'),
+        'max_bytes': config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        'backup_count': config.get('LOG_BACKUP_COUNT', 20),
+    }
+
+def create_file_handler(settings: dict) -> logging.Handler:
+    """Creates the handler writing the log file
+    Parameters
+    ----------
+    settings: dict
+        the settings returned by log_settings
+    Returns
+    -------
+    logging.Handler
+        the rotating file handler
+    """
+    handler = RotatingFileHandler(settings['file'], maxBytes=settings['max_bytes'],
+                                  backupCount=settings['backup_count'])
+    handler.setLevel(settings['level'])
+    if settings['format'] == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s: %(message)s [in %(filename)s: %(lineno)d]'))
+    return handler
+
+def start_log_listener(settings: dict = None, shared: bool = False):
+    """Starts the thread writing the queued records, once per process
+    Parameters
+    ----------
+    settings: dict, optional
+        the settings returned by log_settings, read from CONFIG_TYPE by default
+    shared: bool
+        uses a queue the processes forked afterwards can write to
+    Returns
+    -------
+    queue.Queue | multiprocessing.Queue
+        the queue of the records
+    """
+    global _queue, _listener, _owner
+    if _listener is not None:
+        return _queue
+    settings = settings or log_settings()
+    if shared:
+        share_log_queue()
+    elif _queue is None:
+        _queue = queue.SimpleQueue()
+    _listener = QueueListener(_queue, create_file_handler(settings), respect_handler_level=True)
+    _listener.start()
+    _owner = os.getpid()
+    atexit.register(stop_log_listener)
+    return _queue
+
+def share_log_queue():
+    """Creates the queue the processes forked afterwards put their records on
+
+    Must be called before the application is loaded, so its handler uses this
+    queue instead of starting a listener that only the current process feeds.
+    The records wait on the queue until start_log_listener writes them.
+    Returns
+    -------
+    multiprocessing.Queue
+        the queue of the records
+    """
+    global _queue
+    if _queue is None:
+        _queue = multiprocessing.Queue(-1)
+    return _queue
+
+def stop_log_listener() -> None:
+    "Writes the remaining records and stops the listener"
+    global _listener
+    # forked workers inherit the listener but must not stop the master's thread
+    if _listener is not None and _owner == os.getpid():
+        _listener.stop()
+        _listener = None
+
+def queue_handler(settings: dict) -> logging.Handler:
+    """Creates the handler putting the records on the queue
+
+    Uses the queue inherited from the gunicorn master when there is one,
+    otherwise starts a listener in this process.
+    Parameters
+    ----------
+    settings: dict
+        the settings returned by log_settings
+    Returns
+    -------
+    RecordQueueHandler
+        the non-blocking handler
+    """
+    handler = RecordQueueHandler(_queue if _queue is not None else start_log_listener(settings))
+    handler.setLevel(settings['level'])
+    return handler
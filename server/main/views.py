@@ -1,21 +1,24 @@
-from datetime import datetime
+import math
 
-from flask import (abort, g, redirect, render_template,
-                   request, session, url_for)
-from sqlalchemy import text
+from flask import (abort, current_app, g, make_response, redirect,
+                   render_template, request, url_for)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from server.models import db, Item, ItemPurchase, Purchase, User, Stock
-from server.plugins.login_manager import login_required, login_user, logout_user
+from server.plugins.barcode import invalidate_barcodes
+from server.plugins.login_manager import current_user, login_required, login_user, logout_user
+from server.plugins.pagination import cursor_args, paginate
+from server.plugins.receipts import render_receipt
+from server.plugins.replica import read_replica
 from . import bp
 
 
 @bp.before_app_request
 def before_app_request():
-    if session.get('signed_in'):
-        g.user = User.query.get(session.get('user_id'))
-        if g.user:
-            g.user.last_access = datetime.utcnow()
-            db.session.commit()
+    user = current_user()
+    if user:
+        current_app.extensions['last_access'].touch(user.id)
 
 
 def referer_or(alternative):
@@ -24,6 +27,7 @@ def referer_or(alternative):
 
 @bp.get('/')
 @login_required
+@read_replica
 def index():
     most_sales, total_sales = Item.most_sales()
     most_sold, total_sold = Item.most_sold()
@@ -69,12 +73,10 @@ def logout():
 
 @bp.get('/inventory')
 @login_required
+@read_replica
 def inventory():
-    try:
-        page = int(request.args.get('p', 1))
-    except ValueError:
-        page = 1
-    stocks = Stock.query.order_by(Stock.added_on.desc()).paginate(page, 20)
+    stocks = paginate(Stock.query.options(joinedload(Stock.item)),
+                      (Stock.added_on.desc(), Stock.id.desc()), 20, **cursor_args())
     context = {
         'title': 'Inventory',
         'stocks': stocks,
@@ -84,16 +86,14 @@ def inventory():
 
 @bp.get('/purchase')
 @login_required
+@read_replica
 def purchases():
-    try:
-        page = int(request.args.get('p', 1))
-    except ValueError:
-        page = 1
-    purchases = Purchase.query.order_by(
-        Purchase.added_on.desc()).paginate(page, 20)
+    purchases = paginate(Purchase.query, (Purchase.added_on.desc(), Purchase.id.desc()),
+                         20, **cursor_args())
     context = {
         'title': 'Purchases',
         'purchases': purchases,
+        'item_counts': Purchase.item_counts(purchases.items),
     }
     return render_template('main/purchases.html', **context)
 
@@ -101,14 +101,51 @@ def purchases():
 @bp.get('/purchase/<int:id>')
 @login_required
 def receipt(id: int):
-    purchase = Purchase.query.filter(Purchase.id == id).first_or_404()
+    purchase = db.session.query(Purchase.reference_id) \
+        .filter(Purchase.id == id).first_or_404()
     context = {
-        'title': f'Purchase {purchase.id}',
-        'purchase': purchase
+        'title': f'Purchase {id}',
+        'receipt_url': url_for('main.receipt_document', id=id, reference_id=purchase.reference_id),
     }
     return render_template('main/purchase.html', **context)
 
 
+@bp.get('/purchase/<int:id>/receipt/<reference_id>')
+@login_required
+def receipt_document(id: int, reference_id: str):
+    # the receipt is framed by the page with the navigation and CSRF token, it
+    # never changes and a reused id gets another reference id, so browsers
+    # keep it for good and a revalidation is answered without any query
+    etag = f'{id}-{reference_id}'
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        db.session.query(Purchase.id) \
+            .filter(Purchase.id == id, Purchase.reference_id == reference_id).first_or_404()
+        response = make_response(render_template(
+            'main/receipt.html', id=id, receipt=render_receipt(id, reference_id)))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.post('/purchase/<int:id>')
+@login_required
+def manage_purchase(id: int):
+    if request.form.get('_method') == 'DELETE':
+        return delete_purchase(id)
+    abort(404)
+
+
+def delete_purchase(id: int):
+    purchase = Purchase.query.filter(Purchase.id == id).first_or_404()
+    db.session.delete(purchase)
+    db.session.commit()
+    return redirect(url_for('main.purchases'))
+
+
 @bp.get('/cashier')
 @login_required
 def cashier():
@@ -132,35 +169,35 @@ def new_item():
     bar_code = request.form.get('bar-code')
     item = Item(name=name, price=price, bar_code=bar_code)
     db.session.add(item)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        abort(409)
+    invalidate_barcodes(item.bar_code)
     return redirect(url_for('main.items_all'))
 
 
 @bp.get('/item/all')
 @login_required
+@read_replica
 def items_all():
-    try:
-        page = int(request.args.get('p', 1))
-    except ValueError:
-        page = 1
-    items = Item.query.order_by(Item.name.desc()).paginate(page, 20)
+    items = paginate(Item.query, (Item.name.desc(), Item.id.desc()),
+                     20, **cursor_args())
     context = {
         'title': 'Items',
-        'items': items
+        'items': items,
     }
     return render_template('main/items.html', **context)
 
 
 @bp.get('/item/<int:id>')
 @login_required
+@read_replica
 def item_info(id: int):
     item = Item.query.filter(Item.id == id).first_or_404()
     stocks = item.stocks.order_by(Stock.added_on.desc()).limit(10)
-    purchases = db.session.query(
-        Purchase.id.label('id'), ItemPurchase.quantity.label('quantity'),
-        ItemPurchase.discounted_total.label(
-            'total'), Purchase.added_on.label('added_on')
-    ).select_from(Purchase).join(ItemPurchase).where(ItemPurchase.item_id == item.id).order_by(text('added_on DESC'))
+    purchases = paginate(item.purchase_history(), (ItemPurchase.purchase_id.desc(),), 20)
 
     context = {
         'title': item.name,
@@ -184,29 +221,35 @@ def manage_item(id: int):
 
 def update_item(id: int):
     item = Item.query.filter(Item.id == id).first_or_404()
+    old_bar_code = item.bar_code
     item.name = request.form.get('name')
     item.price = request.form.get('price')
     item.bar_code = request.form.get('bar-code')
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        abort(409)
+    invalidate_barcodes(old_bar_code, item.bar_code)
     return redirect(referer_or(url_for('main.item_info', id=id)))
 
 
 def delete_item(id: int):
     item = Item.query.filter(Item.id == id).first_or_404()
+    bar_code = item.bar_code
     db.session.delete(item)
     db.session.commit()
+    invalidate_barcodes(bar_code)
     return redirect(url_for('main.items_all'))
 
 
 @bp.get('/item/<int:id>/stock')
 @login_required
+@read_replica
 def item_stock(id: int):
-    try:
-        page = int(request.args.get('p', 1))
-    except ValueError:
-        page = 1
     item: Item = Item.query.filter(Item.id == id).first_or_404()
-    stocks = item.stocks.order_by(Stock.added_on.desc()).paginate(page, 20)
+    stocks = paginate(item.stocks, (Stock.added_on.desc(), Stock.id.desc()),
+                      20, **cursor_args())
     context = {
         'title': f'{item.name} Stocks',
         'item': item,
@@ -218,12 +261,18 @@ def item_stock(id: int):
 @bp.post('/stock')
 @login_required
 def add_stock():
-    item_id = request.form.get('item')
-    quantity = request.form.get('quantity')
-    cost = request.form.get('total-cost')
-    per_item_cost = request.form.get('per-item-cost')
-    if not (item_id and quantity and cost and per_item_cost):
+    if not all(request.form.get(key) for key in ('item', 'quantity', 'total-cost', 'per-item-cost')):
         abort(401)
+    # the balances are adjusted from these values, so they are parsed here
+    item_id = request.form.get('item', type=int)
+    quantity = request.form.get('quantity', type=int)
+    cost = request.form.get('total-cost', type=float)
+    per_item_cost = request.form.get('per-item-cost', type=float)
+    if item_id is None or quantity is None or quantity <= 0 \
+            or not all(x is not None and math.isfinite(x) and x >= 0 for x in (cost, per_item_cost)):
+        abort(400)
+    if db.session.get(Item, item_id) is None:
+        abort(404)
     stock = Stock(item_id=item_id, quantity=quantity,
                   cost=cost, per_item_cost=per_item_cost)
     db.session.add(stock)
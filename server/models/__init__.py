@@ -1,4 +1,4 @@
 from server import db
 
-from .item import Item, Stock, ItemPurchase, Purchase
+from .item import Item, Stock, ItemPurchase, Purchase, SalesDaily, CheckoutError
 from .user import User
\ No newline at end of file
@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta
 from uuid import uuid4
 
-from sqlalchemy import func, text
+from sqlalchemy import bindparam, event, func, select
 from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Query, object_session, validates
+from sqlalchemy.orm.util import identity_key
 
 from . import db
 
@@ -16,6 +18,126 @@ def random_uuid() -> str:
     """
     return uuid4().hex
 
+BALANCE_COLUMNS = ('balance_on_hand', 'balance_stocked', 'balance_sold',
+                   'balance_cost', 'balance_revenue',)
+
+def adjust_balances(connection, deltas: list) -> None:
+    """Applies balance deltas to the items in a single statement
+    Parameters
+    ----------
+    connection: sqlalchemy.engine.Connection
+        the connection of the current transaction
+    deltas: list
+        dictionaries with the item_id and the on_hand, stocked, sold, cost
+        and revenue changes of the item (missing changes default to 0)
+    """
+    if not deltas:
+        return
+    table = Item.__table__
+    params = [{
+        'item_id': delta['item_id'],
+        'on_hand': delta.get('on_hand', 0),
+        'stocked': delta.get('stocked', 0),
+        'sold': delta.get('sold', 0),
+        'cost': delta.get('cost', 0.0),
+        'revenue': delta.get('revenue', 0.0),
+    } for delta in deltas]
+    statement = table.update().where(table.c.id == bindparam('item_id')).values(
+        balance_on_hand=table.c.balance_on_hand + bindparam('on_hand'),
+        balance_stocked=table.c.balance_stocked + bindparam('stocked'),
+        balance_sold=table.c.balance_sold + bindparam('sold'),
+        balance_cost=table.c.balance_cost + bindparam('cost'),
+        balance_revenue=table.c.balance_revenue + bindparam('revenue'),
+    )
+    connection.execute(statement, params)
+
+def sales_window(start_date=None, end_date=None) -> tuple:
+    """Resolves the days of a sales timeframe
+    Parameters
+    ----------
+    start_date: datetime.date, optional
+        the start of the timeframe, 30 days before the end when not specified
+    end_date: datetime.date, optional
+        the end of the timeframe, today when not specified
+    Returns
+    -------
+    tuple
+        the first and last day of the timeframe
+    """
+    if end_date is None:
+        end_date = datetime.utcnow().date()
+    elif isinstance(end_date, datetime):
+        end_date = end_date.date()
+    if start_date is None:
+        start_date = end_date - timedelta(days=30)
+    elif isinstance(start_date, datetime):
+        start_date = start_date.date()
+    return start_date, end_date
+
+def record_sales(connection, sales: list) -> None:
+    """Adds the quantities and revenues to the daily sales rollup
+    Parameters
+    ----------
+    connection: sqlalchemy.engine.Connection
+        the connection of the current transaction
+    sales: list
+        dictionaries with the item_id, day, quantity and revenue to add
+    """
+    if not sales:
+        return
+    table = SalesDaily.__table__
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.item_id, table.c.day],
+            set_={
+                'quantity': table.c.quantity + statement.excluded.quantity,
+                'revenue': table.c.revenue + statement.excluded.revenue,
+            },
+        )
+        connection.execute(statement, sales)
+        return
+    update = table.update().where(
+        table.c.item_id == bindparam('_item_id'), table.c.day == bindparam('_day')
+    ).values(quantity=table.c.quantity + bindparam('quantity'),
+             revenue=table.c.revenue + bindparam('revenue'))
+    for sale in sales:
+        params = {**sale, '_item_id': sale['item_id'], '_day': sale['day']}
+        if connection.execute(update, params).rowcount == 0:
+            connection.execute(table.insert(), sale)
+
+def lock_for_update() -> None:
+    """Takes the database write lock up front on SQLite
+
+    Other databases rely on row locks (``SELECT ... FOR UPDATE``) instead, which
+    SQLite does not support.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        return
+    # pysqlite only begins a transaction on the first write, so a read-check-write
+    # sequence would not be atomic without an explicit immediate transaction
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+class CheckoutError(ValueError):
+    """Raised when a checkout can not be fulfilled
+
+    ...
+    Attributes
+    ----------
+    errors: list
+        the problems of each rejected cart line
+    """
+    def __init__(self, errors: list):
+        super().__init__('Checkout failed')
+        self.errors = errors
+
 class Item(db.Model, SerializerMixin):
     """Item model storing the items information in the database
 
@@ -36,6 +158,18 @@ class Item(db.Model, SerializerMixin):
         stock history of the item
     purchases: sqlalchemy.orm.dynamic.AppenderBaseQuery
         purchase history of the item
+    sales: sqlalchemy.orm.dynamic.AppenderBaseQuery
+        daily sales of the item
+    balance_on_hand: int
+        maintained available stock of the item
+    balance_stocked: int
+        maintained sum of the stock history of the item
+    balance_sold: int
+        maintained number of times the item was purchased
+    balance_cost: float
+        maintained total costs of the item's stocks
+    balance_revenue: float
+        maintained total money of the purchases made with this item
     in_stock: int
         available stock of the item
     total_stock: int
@@ -46,27 +180,46 @@ class Item(db.Model, SerializerMixin):
         total costs the item was needed
     total_sold: float
         total money of the purchases made with this item
+    summary: dict
+        the stock, quantity sold, revenue and costs of the item
     
     Methods
     -------
-    get_sold(self, start_date=datetime.utcnow()-timedelta(days=30), end_date=datetime.utcnow()) -> int
+    normalize_bar_code(self, key: str, bar_code: str) -> str | None
+        stores blank bar codes as null
+    purchase_history(self) -> sqlalchemy.orm.Query
+        returns the purchases of the item, newest first
+    stock_levels(cls, items) -> dict
+        returns the available stock of several items using a single query
+    ledger_balances(cls) -> dict
+        returns the balances of every item computed from the stock and purchase history
+    get_sold(self, start_date=None, end_date=None) -> int
         returns the number of items purchased in the specified timeframe
-    most_sales(cls, start_date=datetime.utcnow()-timedelta(days=30), end_date=datetime.utcnow()) -> tuple
+    most_sales(cls, start_date=None, end_date=None) -> tuple
         returns the item with the most sales in the specified timeframe
-    most_sold(cls,  start_date=datetime.utcnow()-timedelta(days=30), end_date=datetime.utcnow()) -> tuple
+    most_sold(cls, start_date=None, end_date=None) -> tuple
         returns the item with the most items sold in the specified timeframe
     """
     __tablename__ = 'item'
+    __table_args__ = (
+        db.Index('ix_item_name', 'name', 'id'),
+    )
     serialize_only = ('id', 'bar_code', 'name', 'price', 'added_on',)
     id = db.Column(db.Integer, primary_key=True)
-    bar_code = db.Column(db.String(128), nullable=True)
+    bar_code = db.Column(db.String(128), nullable=True, unique=True, index=True)
     name = db.Column(db.String(200), nullable=False)
     price = db.Column(db.Float, default=0.0)
     added_on = db.Column(db.DateTime, default=datetime.utcnow)
+    balance_on_hand = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    balance_stocked = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    balance_sold = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    balance_cost = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    balance_revenue = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
     stocks = db.relationship('Stock', lazy="dynamic", cascade="all, delete-orphan",
                              backref=db.backref('item', uselist=False))
     purchases = db.relationship('ItemPurchase', lazy='dynamic', cascade="all, delete-orphan",
                                 backref=db.backref('item', uselist=False))
+    sales = db.relationship('SalesDaily', lazy='dynamic', cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f'<Item {self.id}>'
@@ -74,6 +227,26 @@ class Item(db.Model, SerializerMixin):
     def __str__(self) -> str:
         return f'{self.name} {self.price} PHP'
 
+    @validates('bar_code')
+    def normalize_bar_code(self, key, bar_code: str):
+        """Stores blank bar codes as null so they don't clash with the unique index
+        Parameters
+        ----------
+        self: Item
+            the item
+        key: str
+            the name of the field
+        bar_code: str
+            the bar code of the item
+
+        Returns
+        -------
+        str | None
+            the stripped bar code
+        """
+        bar_code = (bar_code or '').strip()
+        return bar_code or None
+
     @property
     def in_stock(self) -> int:
         """Available stock of the item
@@ -86,7 +259,7 @@ class Item(db.Model, SerializerMixin):
         int
             the available stock of the item
         """
-        return self.total_stock - self.total_purchases
+        return self.balance_on_hand or 0
 
     @property
     def total_stock(self) -> int:
@@ -100,9 +273,7 @@ class Item(db.Model, SerializerMixin):
         int
             sum of the stock history of the item
         """
-        result = db.session.query(func.sum(Stock.quantity).label('total_quantity')) \
-            .select_from(Stock).where(Stock.item_id == self.id)[0][0]
-        return result or 0
+        return self.balance_stocked or 0
 
     @property
     def total_purchases(self) -> int:
@@ -116,9 +287,7 @@ class Item(db.Model, SerializerMixin):
         int
             number of times the item was purchased
         """
-        result = db.session.query(func.sum(ItemPurchase.quantity).label('total_quantity')) \
-            .select_from(ItemPurchase).where(ItemPurchase.item_id == self.id)[0][0]
-        return result or 0
+        return self.balance_sold or 0
 
     @property
     def stock_costs(self) -> float:
@@ -132,9 +301,7 @@ class Item(db.Model, SerializerMixin):
         float
             total costs the item was needed
         """
-        result = db.session.query(func.sum(Stock.cost).label('total_cost')) \
-            .select_from(Stock).where(Stock.item_id == self.id)[0][0]
-        return result or 0.0
+        return self.balance_cost or 0.0
 
     @property
     def total_sold(self) -> float:
@@ -148,72 +315,197 @@ class Item(db.Model, SerializerMixin):
         float
             total money of the purchases made with this item
         """
-        result = db.session.query(func.sum(ItemPurchase.total).label('total_sold')) \
-            .select_from(ItemPurchase).where(ItemPurchase.item_id == self.id)[0][0]
-        return result or 0.0
+        return self.balance_revenue or 0.0
 
-    def get_sold(self, start_date=datetime.utcnow()-timedelta(days=30), end_date=datetime.utcnow()) -> int:
+    @property
+    def summary(self) -> dict:
+        """Summarizes the stock and sales of the item from its balances
+        Parameters
+        ----------
+        self: Item
+            the item
+        Returns
+        -------
+        dict
+            the in_stock, sold, revenue and cost of the item
+        """
+        return {
+            'in_stock': self.in_stock,
+            'sold': self.total_purchases,
+            'revenue': self.total_sold,
+            'cost': self.stock_costs,
+        }
+
+    def purchase_history(self):
+        """Gets the purchases of the item, newest first
+
+        The lines are ordered by purchase id to walk the primary key index of
+        item_purchase, purchase ids increase with their purchase time.
+        Parameters
+        ----------
+        self: Item
+            the item
+        Returns
+        -------
+        sqlalchemy.orm.Query
+            the id, quantity, total and added_on of the purchases
+        """
+        return db.session.query(
+            Purchase.id.label('id'), ItemPurchase.quantity.label('quantity'),
+            ItemPurchase.discounted_total.label('total'), Purchase.added_on.label('added_on'),
+        ).select_from(ItemPurchase).join(Purchase) \
+            .filter(ItemPurchase.item_id == self.id) \
+            .order_by(ItemPurchase.purchase_id.desc())
+
+    @classmethod
+    def stock_levels(cls, items) -> dict:
+        """Gets the available stock of several items using a single query, loaded
+        items already carry it in in_stock
+        Parameters
+        ----------
+        cls: Item
+            the Item object
+        items: sqlalchemy.orm.Query | Iterable[Item | int]
+            a query of items, or the items or ids to look up
+        Returns
+        -------
+        dict
+            the available stock keyed by the item id
+        """
+        if isinstance(items, Query):
+            ids = items.with_entities(cls.id).subquery()
+            condition = cls.id.in_(select(ids.c.id))
+        else:
+            ids = [x.id if isinstance(x, cls) else x for x in items]
+            if not ids:
+                return {}
+            condition = cls.id.in_(ids)
+        return dict(db.session.query(cls.id, cls.balance_on_hand).filter(condition))
+
+    @classmethod
+    def ledger_balances(cls) -> dict:
+        """Computes the balances of every item from the stock and purchase history
+        Parameters
+        ----------
+        cls: Item
+            the Item object
+        Returns
+        -------
+        dict
+            the balance columns of each item keyed by the item id
+        """
+        balances = {
+            item_id: dict.fromkeys(BALANCE_COLUMNS, 0)
+            for item_id, in db.session.query(cls.id)
+        }
+        stocks = db.session.query(
+            Stock.item_id, func.sum(Stock.quantity), func.sum(Stock.cost)
+        ).group_by(Stock.item_id)
+        for item_id, quantity, cost in stocks:
+            if item_id in balances:
+                balances[item_id]['balance_stocked'] = quantity or 0
+                balances[item_id]['balance_cost'] = cost or 0.0
+        purchases = db.session.query(
+            ItemPurchase.item_id, func.sum(ItemPurchase.quantity), func.sum(ItemPurchase.total)
+        ).group_by(ItemPurchase.item_id)
+        for item_id, quantity, total in purchases:
+            if item_id in balances:
+                balances[item_id]['balance_sold'] = quantity or 0
+                balances[item_id]['balance_revenue'] = total or 0.0
+        for balance in balances.values():
+            balance['balance_on_hand'] = balance['balance_stocked'] - balance['balance_sold']
+        return balances
+
+    def get_sold(self, start_date=None, end_date=None) -> int:
         """Gets the number of items purchased in the specified timeframe
         Parameters
         ----------
         self: Item
             the item
-        start_date: datetime.datetime, optional
-            start of the timeframe
-        end_date: datetime.datetime, optional
-        
+        start_date: datetime.date, optional
+            start of the timeframe, 30 days before the end when not specified
+        end_date: datetime.date, optional
+            end of the timeframe, today when not specified
+
         Returns
         -------
         int
             total number of items purchased
         """
-        result = db.session.query(func.sum(ItemPurchase.quantity).label('total_sold')) \
-            .select_from(ItemPurchase).join(Purchase, Purchase.id == ItemPurchase.purchase_id) \
-            .filter(ItemPurchase.item_id == self.id).first()
-        return result[0] if result else 0
+        start_date, end_date = sales_window(start_date, end_date)
+        result = db.session.query(func.sum(SalesDaily.quantity)) \
+            .filter(SalesDaily.item_id == self.id, SalesDaily.day.between(start_date, end_date)).scalar()
+        return result or 0
+
+    @classmethod
+    def sales_ranking(cls, column, start_date=None, end_date=None) -> Query:
+        """Builds the query of the item with the highest total of a sales column
+        in the specified timeframe
+
+        The rollup rows of the days are aggregated first and only the top
+        item is joined, so the items are not all read.
+        Parameters
+        ----------
+        cls: Item
+            the Item object
+        column: sqlalchemy.Column
+            SalesDaily.revenue or SalesDaily.quantity
+        start_date: datetime.date, optional
+            the start of the timeframe, 30 days before the end when not specified
+        end_date: datetime.date, optional
+            the end of the timeframe, today when not specified
+
+        Returns
+        -------
+        Query
+            the item along with its total
+        """
+        start_date, end_date = sales_window(start_date, end_date)
+        total = func.sum(column).label('total')
+        ranking = db.session.query(SalesDaily.item_id, total) \
+            .filter(SalesDaily.day.between(start_date, end_date)) \
+            .group_by(SalesDaily.item_id).order_by(total.desc(), SalesDaily.item_id) \
+            .limit(1).subquery()
+        return db.session.query(cls, ranking.c.total).join(ranking, ranking.c.item_id == cls.id)
 
     @classmethod
-    def most_sales(cls, start_date=datetime.utcnow()-timedelta(days=30), end_date=datetime.utcnow()) -> tuple:
+    def most_sales(cls, start_date=None, end_date=None) -> tuple:
         """Gets the item with the most sales in the specified timeframe
         Parameters
         ----------
         cls: Item
             the Item object
-        start_date: datetime.datetime, optional
-            the start of the timeframe
-        end_date: datetime.datetime, optional
-            the end of the timeframe
+        start_date: datetime.date, optional
+            the start of the timeframe, 30 days before the end when not specified
+        end_date: datetime.date, optional
+            the end of the timeframe, today when not specified
 
         Returns
         -------
         tuple
             the item along with the total sales it made in the specified timeframe
         """
-        result = db.session.query(cls, func.sum(ItemPurchase.total).label('total_sales')) \
-            .join(ItemPurchase).join(Purchase, Purchase.id == ItemPurchase.purchase_id) \
-            .filter(Purchase.added_on.between(start_date, end_date)).group_by(Item) \
-            .order_by(text('total_sales DESC')).first()
+        result = cls.sales_ranking(SalesDaily.revenue, start_date, end_date).first()
         return result if result else (None, 0,)
 
     @classmethod
-    def most_sold(cls, start_date=datetime.utcnow()-timedelta(days=30), end_date=datetime.utcnow()) -> tuple:
+    def most_sold(cls, start_date=None, end_date=None) -> tuple:
         """Gets the item with the most items sold in the specified timefraze
         Parameters
         ----------
         cls: Item
             the Item object
-        start_date: datetime.datetime, optional
-        end_date: datetime.datetime, optional
+        start_date: datetime.date, optional
+            the start of the timeframe, 30 days before the end when not specified
+        end_date: datetime.date, optional
+            the end of the timeframe, today when not specified
 
         Returns
         -------
         tuple
             the item along with the total items sold it made in the specified timeframe
         """
-        result = db.session.query(cls, func.sum(ItemPurchase.quantity).label('total_sold')) \
-            .join(ItemPurchase).join(Purchase, Purchase.id == ItemPurchase.purchase_id) \
-            .filter(Purchase.added_on.between(start_date, end_date)).group_by(Item) \
-            .order_by(text('total_sold DESC')).first()
+        result = cls.sales_ranking(SalesDaily.quantity, start_date, end_date).first()
         return result if result else (None, 0,)
 
 
@@ -239,6 +531,10 @@ class Stock(db.Model):
         the item that was stocked
     """
     __tablename__ = 'stock'
+    __table_args__ = (
+        db.Index('ix_stock_added_on', 'added_on', 'id'),
+        db.Index('ix_stock_item_id_added_on', 'item_id', 'added_on', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
     cost = db.Column(db.Float)
@@ -268,6 +564,10 @@ class ItemPurchase(db.Model):
         total items bought
     total: float
         total of the purchase
+    name: str
+        the name of the item when it was bought
+    bar_code: str
+        the bar code of the item when it was bought
     item: Item
         the item bought
     purchase: Purchase
@@ -281,11 +581,13 @@ class ItemPurchase(db.Model):
     __tablename__ = 'item_purchase'
     item_id = db.Column(db.Integer, db.ForeignKey('item.id'), primary_key=True)
     purchase_id = db.Column(db.Integer, db.ForeignKey(
-        'purchase.id'), primary_key=True)
+        'purchase.id'), primary_key=True, index=True)
     price = db.Column(db.Float, nullable=False)
     discount = db.Column(db.Float, default=0)
     quantity = db.Column(db.Integer, nullable=False)
     total = db.Column(db.Float, nullable=False)
+    name = db.Column(db.String(200))
+    bar_code = db.Column(db.String(128))
 
     @hybrid_property
     def discounted_total(self) -> float:
@@ -322,10 +624,19 @@ class Purchase(db.Model):
     -------
     discounted_total(self) -> float
         returns the discounted total of the purchase
+    checkout(cls, lines: dict) -> Purchase
+        records a purchase of the items and takes them from the stock
+    item_counts(cls, purchases) -> dict
+        counts the item lines of several purchases using a single query
+    receipt_lines(self) -> list
+        gets the item lines of the purchase with their items
     """
     __tablename__ = 'purchase'
+    __table_args__ = (
+        db.Index('ix_purchase_added_on', 'added_on', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    reference_id = db.Column(db.String(32), default=random_uuid)
+    reference_id = db.Column(db.String(32), default=random_uuid, index=True)
     items = db.relationship('ItemPurchase', lazy='dynamic', cascade="all, delete-orphan",
                             backref=db.backref('purchase', uselist=False))
     discount = db.Column(db.Float, default=0)
@@ -342,5 +653,201 @@ class Purchase(db.Model):
         """
         return self.total - (self.total * self.discount)
 
+    @classmethod
+    def item_counts(cls, purchases) -> dict:
+        """Counts the item lines of several purchases using a single query
+        Parameters
+        ----------
+        cls: Purchase
+            the Purchase object
+        purchases: Iterable[Purchase | int]
+            the purchases or ids to count
+        Returns
+        -------
+        dict
+            the number of item lines keyed by the purchase id
+        """
+        ids = [x.id if isinstance(x, cls) else x for x in purchases]
+        if not ids:
+            return {}
+        return dict(
+            db.session.query(ItemPurchase.purchase_id, func.count())
+            .filter(ItemPurchase.purchase_id.in_(ids))
+            .group_by(ItemPurchase.purchase_id)
+        )
+
+    def receipt_lines(self) -> list:
+        """Gets the item lines of the purchase
+        Returns
+        -------
+        list
+            the ItemPurchase records, with the names and bar codes the items
+            had when they were sold
+        """
+        return self.items.all()
+
+    @classmethod
+    def checkout(cls, lines: dict):
+        """Records a purchase of the items and takes them from the stock
+
+        The purchased items are locked while the stock is checked so concurrent
+        checkouts can not sell the same stock twice.
+        Parameters
+        ----------
+        cls: Purchase
+            the Purchase object
+        lines: dict
+            the quantity bought keyed by the item id
+
+        Raises
+        ------
+        CheckoutError
+            raised when an item does not exist or is short on stock
+
+        Returns
+        -------
+        Purchase
+            the recorded purchase (not yet committed)
+        """
+        lock_for_update()
+        # concurrent checkouts lock their rows in the same order so they can't deadlock
+        items = Item.query.filter(Item.id.in_(lines)).order_by(Item.id).with_for_update()
+        items = {item.id: item for item in items}
+        errors = []
+        for item_id, quantity in lines.items():
+            item = items.get(item_id)
+            if item is None:
+                errors.append({'id': item_id, 'error': 'not_found'})
+            elif item.in_stock < quantity:
+                errors.append({
+                    'id': item_id, 'name': item.name, 'error': 'insufficient_stock',
+                    'requested': quantity, 'available': item.in_stock,
+                })
+        if errors:
+            raise CheckoutError(errors)
+
+        rows = [{
+            'item_id': item_id,
+            'quantity': quantity,
+            'price': items[item_id].price,
+            'total': quantity * items[item_id].price,
+            'name': items[item_id].name,
+            'bar_code': items[item_id].bar_code,
+        } for item_id, quantity in lines.items()]
+        purchase = cls(total=sum(row['total'] for row in rows))
+        db.session.add(purchase)
+        db.session.flush()
+        for row in rows:
+            row['purchase_id'] = purchase.id
+        # bulk inserts skip the mapper events so the balances are adjusted here
+        connection = db.session.connection()
+        connection.execute(ItemPurchase.__table__.insert(), rows)
+        adjust_balances(connection, [
+            _purchase_delta(row['item_id'], row['quantity'], row['total'], 1) for row in rows
+        ])
+        day = purchase.added_on.date()
+        record_sales(connection, [{
+            'item_id': row['item_id'], 'day': day,
+            'quantity': row['quantity'], 'revenue': row['total'],
+        } for row in rows])
+        for item in items.values():
+            db.session.expire(item, BALANCE_COLUMNS)
+        return purchase
+
     def __repr__(self) -> str:
         return f'<Purchase {self.id}>'
+
+
+class SalesDaily(db.Model):
+    """SalesDaily model storing the daily sales rollup of the items
+
+    ...
+    Attributes
+    ----------
+    item_id: int
+        the id of the sold item
+    day: datetime.date
+        the day of the purchases
+    quantity: int
+        number of items sold in the day
+    revenue: float
+        total money of the purchases made with the item in the day
+    """
+    __tablename__ = 'sales_daily'
+    __table_args__ = (
+        # covers the dashboard aggregates of a range of days
+        db.Index('ix_sales_daily_day', 'day', 'item_id', 'quantity', 'revenue'),
+    )
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self) -> str:
+        return f'<SalesDaily {self.item_id} {self.day}>'
+
+
+def _stock_delta(stock: Stock, sign: int) -> dict:
+    quantity = int(stock.quantity or 0) * sign
+    return {
+        'item_id': stock.item_id,
+        'on_hand': quantity,
+        'stocked': quantity,
+        'cost': float(stock.cost or 0) * sign,
+    }
+
+def _purchase_delta(item_id: int, quantity: int, total: float, sign: int) -> dict:
+    quantity = int(quantity or 0) * sign
+    return {
+        'item_id': item_id,
+        'on_hand': -quantity,
+        'sold': quantity,
+        'revenue': float(total or 0) * sign,
+    }
+
+def _track_balance_change(connection, target, delta: dict) -> None:
+    "Updates the item balance and marks the loaded item to be refreshed after the flush"
+    adjust_balances(connection, [delta])
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('stale_balances', set()).add(delta['item_id'])
+
+@event.listens_for(Stock, 'after_insert')
+def stock_inserted(mapper, connection, target):
+    _track_balance_change(connection, target, _stock_delta(target, 1))
+
+@event.listens_for(Stock, 'after_delete')
+def stock_deleted(mapper, connection, target):
+    _track_balance_change(connection, target, _stock_delta(target, -1))
+
+def _track_sale(connection, target: ItemPurchase, sign: int) -> None:
+    "Updates the daily sales rollup of the purchased item"
+    added_on = connection.execute(
+        select(Purchase.added_on).where(Purchase.id == target.purchase_id)).scalar()
+    if added_on is None:
+        return
+    record_sales(connection, [{
+        'item_id': target.item_id, 'day': added_on.date(),
+        'quantity': int(target.quantity or 0) * sign,
+        'revenue': float(target.total or 0) * sign,
+    }])
+
+@event.listens_for(ItemPurchase, 'after_insert')
+def item_purchase_inserted(mapper, connection, target):
+    delta = _purchase_delta(target.item_id, target.quantity, target.total, 1)
+    _track_balance_change(connection, target, delta)
+    _track_sale(connection, target, 1)
+
+@event.listens_for(ItemPurchase, 'after_delete')
+def item_purchase_deleted(mapper, connection, target):
+    delta = _purchase_delta(target.item_id, target.quantity, target.total, -1)
+    _track_balance_change(connection, target, delta)
+    _track_sale(connection, target, -1)
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def expire_stale_balances(session, flush_context):
+    "Expires the balances of loaded items that were updated during the flush"
+    for item_id in session.info.pop('stale_balances', ()):
+        item = session.identity_map.get(identity_key(Item, item_id))
+        if item is not None:
+            session.expire(item, BALANCE_COLUMNS)
@@ -0,0 +1,54 @@
+from flask import current_app
+
+from server.models import Item
+from .cache import LRUCache
+from .replica import read_primary
+
+def init_barcode_cache(app) -> None:
+    """Creates the barcode lookup cache of the application
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    """
+    app.extensions['barcode_cache'] = LRUCache(
+        app.config.get('BARCODE_CACHE_SIZE', 4096),
+        app.config.get('BARCODE_CACHE_TTL', 60),
+    )
+
+def lookup_barcode(bar_code: str) -> dict:
+    """Finds the item with the exact bar code
+    Parameters
+    ----------
+    bar_code: str
+        the scanned bar code
+    Returns
+    -------
+    dict | None
+        the id, bar code, name and price of the item
+    """
+    cache = current_app.extensions['barcode_cache']
+    result = cache.get(bar_code)
+    if result is None:
+        # the cache is shared by the requests of the worker, including those of
+        # clients that just wrote, so it is filled from the primary
+        with read_primary():
+            row = Item.query.with_entities(Item.id, Item.bar_code, Item.name, Item.price) \
+                .filter(Item.bar_code == bar_code).first()
+        if row is None:
+            return None
+        result = dict(row._mapping)
+        cache.set(bar_code, result)
+    return result
+
+def invalidate_barcodes(*bar_codes: str) -> None:
+    """Removes the bar codes from the lookup cache
+    Parameters
+    ----------
+    bar_codes: str
+        the bar codes of the changed items
+    """
+    cache = current_app.extensions['barcode_cache']
+    for bar_code in bar_codes:
+        if bar_code:
+            cache.pop(bar_code)
@@ -0,0 +1,393 @@
+"""Streaming import and export of the items, stock and purchase history
+
+Records are read and written one at a time and sent to the database in
+batches, so the memory used does not grow with the size of the file.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+
+from server.models import db, Item, ItemPurchase, Purchase, Stock
+from server.models.item import adjust_balances
+from .barcode import invalidate_barcodes
+
+FORMATS = ('csv', 'jsonl')
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+# the largest value of a 64 bit integer column
+MAX_INTEGER = 2 ** 63 - 1
+
+def guess_format(filename: str = None, mimetype: str = None) -> str:
+    """Picks the format of a file from its extension or mimetype
+    Parameters
+    ----------
+    filename: str, optional
+        the name of the file
+    mimetype: str, optional
+        the mimetype of the file
+    Returns
+    -------
+    str
+        jsonl for JSON lines files, csv otherwise
+    """
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json'):
+        return 'jsonl'
+    return 'csv'
+
+def read_records(stream, format: str):
+    """Reads the records of a binary stream one at a time
+    Parameters
+    ----------
+    stream: BinaryIO
+        the file or request body
+    format: str
+        csv with a header row, or jsonl with one object per line
+    Yields
+    ------
+    tuple
+        the line number and the fields of the record, None when the line
+        is not a JSON object
+    """
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format!r}, use one of {", ".join(FORMATS)}')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if format == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+def _text(record: dict, key: str) -> str:
+    value = record.get(key)
+    return '' if value is None else str(value).strip()
+
+def _number(record: dict, key: str, cast=float):
+    value = _text(record, key)
+    if not value:
+        return None
+    number = float(value)
+    # nan and inf parse as floats but can't be stored or added to the balances
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(value)
+    if cast is int:
+        if not number.is_integer() or number > MAX_INTEGER:
+            raise ValueError(value)
+        try:
+            return int(number)
+        except OverflowError:
+            raise ValueError(value)
+    return number
+
+
+class ImportReport:
+    """Counts of an import and the first problems of its records
+
+    ...
+    Attributes
+    ----------
+    inserted: int
+        number of inserted rows
+    updated: int
+        number of updated rows
+    errors: list
+        the line and problem of the first rejected records
+    failed: int
+        number of rejected records
+    """
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.errors = []
+        self.failed = 0
+
+    def reject(self, line: int, error: str, **details):
+        """Records a rejected record
+        Parameters
+        ----------
+        line: int
+            the line number of the record
+        error: str
+            the problem of the record
+        """
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'error': error, **details})
+
+    def to_dict(self) -> dict:
+        "Gets the counts and errors as a dictionary"
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+class ImportAborted(Exception):
+    """Raised when an import stops before the end of its records, the batches
+    before the failing one stay committed
+
+    ...
+    Attributes
+    ----------
+    report: ImportReport
+        the counts and rejected records of the committed batches
+    errors: list
+        the lines that stopped the import
+    """
+    def __init__(self, report: ImportReport, errors: list):
+        super().__init__('Import aborted')
+        self.report = report
+        self.errors = errors
+
+
+class ImportConflict(ImportAborted):
+    "Raised when a batch conflicts with the rows written since the import started"
+
+
+def _batches(records, size: int, report: ImportReport):
+    batch = []
+    line = 0
+    try:
+        for line, record in records:
+            batch.append((line, record))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    except UnicodeDecodeError as e:
+        # the file is decoded while it is read, after the first batches were written
+        raise ImportAborted(report, [{'line': line + 1, 'error': 'invalid_encoding'}]) from e
+    if batch:
+        yield batch
+
+def _batch_conflict(batch: list) -> list:
+    return [{'line': batch[0][0], 'error': 'batch_conflict', 'last_line': batch[-1][0]}]
+
+def import_items(records, batch_size: int = BATCH_SIZE) -> ImportReport:
+    """Creates the items of the records, or updates the name and price of the
+    items whose bar code already exists
+
+    Each batch is committed on its own so a large import doesn't hold the
+    write lock for its whole duration.
+    Parameters
+    ----------
+    records: Iterable
+        the line numbers and fields (bar_code, name, price) returned by read_records
+    batch_size: int
+        the number of records written per statement
+    Returns
+    -------
+    ImportReport
+        the counts and rejected records
+    Raises
+    ------
+    ImportConflict
+        raised when a batch inserts a bar code another writer added meanwhile
+    ImportAborted
+        raised when the rest of the file is not valid UTF-8
+    """
+    report = ImportReport()
+    table = Item.__table__
+    known = {bar_code for bar_code, in db.session.query(Item.bar_code).filter(Item.bar_code.isnot(None))}
+    update = table.update().where(table.c.bar_code == bindparam('_bar_code')) \
+        .values(name=bindparam('name'), price=bindparam('price'))
+    for batch in _batches(records, batch_size, report):
+        inserts, updates, insert_lines = [], [], []
+        for line, record in batch:
+            if record is None:
+                report.reject(line, 'invalid_record')
+                continue
+            bar_code = _text(record, 'bar_code') or None
+            name = _text(record, 'name')
+            try:
+                price = _number(record, 'price')
+            except ValueError:
+                report.reject(line, 'invalid_price', bar_code=bar_code)
+                continue
+            if not name or price is None:
+                report.reject(line, 'missing_field', bar_code=bar_code)
+                continue
+            if bar_code in known:
+                updates.append({'_bar_code': bar_code, 'name': name, 'price': price})
+            else:
+                inserts.append({'bar_code': bar_code, 'name': name, 'price': price})
+                insert_lines.append(line)
+                if bar_code:
+                    known.add(bar_code)
+        try:
+            if inserts:
+                db.session.execute(table.insert(), inserts)
+            if updates:
+                db.session.execute(update, updates)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            # another writer added some of the bar codes after they were loaded
+            bar_codes = [row['bar_code'] for row in inserts if row['bar_code']]
+            taken = {bar_code for bar_code, in db.session.query(Item.bar_code)
+                     .filter(Item.bar_code.in_(bar_codes))} if bar_codes else set()
+            errors = [{'line': line, 'error': 'duplicate_bar_code', 'bar_code': row['bar_code']}
+                      for line, row in zip(insert_lines, inserts) if row['bar_code'] in taken]
+            raise ImportConflict(report, errors or _batch_conflict(batch)) from e
+        report.inserted += len(inserts)
+        report.updated += len(updates)
+        if updates:
+            invalidate_barcodes(*(row['_bar_code'] for row in updates))
+    return report
+
+def import_stock(records, batch_size: int = BATCH_SIZE) -> ImportReport:
+    """Adds the stock entries of the records and their quantities and costs to
+    the item balances
+    Parameters
+    ----------
+    records: Iterable
+        the line numbers and fields (bar_code or item_id, quantity,
+        per_item_cost or cost, optional added_on) returned by read_records
+    batch_size: int
+        the number of records written per statement
+    Returns
+    -------
+    ImportReport
+        the counts and rejected records
+    Raises
+    ------
+    ImportConflict
+        raised when a batch violates a constraint, such as an item deleted meanwhile
+    ImportAborted
+        raised when the rest of the file is not valid UTF-8
+    """
+    report = ImportReport()
+    table = Stock.__table__
+    item_ids, valid_ids = {}, set()
+    for item_id, bar_code in db.session.query(Item.id, Item.bar_code):
+        valid_ids.add(item_id)
+        if bar_code:
+            item_ids[bar_code] = item_id
+    for batch in _batches(records, batch_size, report):
+        rows = []
+        deltas = {}
+        for line, record in batch:
+            if record is None:
+                report.reject(line, 'invalid_record')
+                continue
+            bar_code = _text(record, 'bar_code')
+            try:
+                item_id = item_ids.get(bar_code) if bar_code else _number(record, 'item_id', int)
+                quantity = _number(record, 'quantity', int)
+                per_item_cost = _number(record, 'per_item_cost')
+                cost = _number(record, 'cost')
+                added_on = _text(record, 'added_on')
+                added_on = datetime.fromisoformat(added_on) if added_on else datetime.utcnow()
+            except ValueError:
+                report.reject(line, 'invalid_value', bar_code=bar_code or None)
+                continue
+            if item_id not in valid_ids:
+                report.reject(line, 'item_not_found', bar_code=bar_code or None)
+                continue
+            if not quantity or (per_item_cost is None and cost is None):
+                report.reject(line, 'missing_field', bar_code=bar_code or None)
+                continue
+            if cost is None:
+                cost = per_item_cost * quantity
+            elif per_item_cost is None:
+                per_item_cost = cost / quantity
+            rows.append({'item_id': item_id, 'quantity': quantity, 'cost': cost,
+                         'per_item_cost': per_item_cost, 'added_on': added_on})
+            delta = deltas.setdefault(item_id, {'item_id': item_id, 'on_hand': 0, 'stocked': 0, 'cost': 0.0})
+            delta['on_hand'] += quantity
+            delta['stocked'] += quantity
+            delta['cost'] += cost
+        try:
+            if rows:
+                # bulk inserts skip the mapper events so the balances are adjusted here
+                db.session.execute(table.insert(), rows)
+                adjust_balances(db.session.connection(), list(deltas.values()))
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            raise ImportConflict(report, _batch_conflict(batch)) from e
+        report.inserted += len(rows)
+    return report
+
+def _export_items():
+    return ('id', 'bar_code', 'name', 'price', 'stock', 'added_on'), \
+        db.session.query(Item.id, Item.bar_code, Item.name, Item.price,
+                         Item.balance_on_hand, Item.added_on).order_by(Item.id)
+
+def _export_stock():
+    return ('id', 'item_id', 'bar_code', 'quantity', 'per_item_cost', 'cost', 'added_on'), \
+        db.session.query(Stock.id, Stock.item_id, Item.bar_code, Stock.quantity,
+                         Stock.per_item_cost, Stock.cost, Stock.added_on) \
+        .join(Item, Item.id == Stock.item_id).order_by(Stock.id)
+
+def _export_purchases():
+    return ('purchase_id', 'reference_id', 'added_on', 'item_id', 'bar_code', 'name',
+            'price', 'quantity', 'total'), \
+        db.session.query(Purchase.id, Purchase.reference_id, Purchase.added_on,
+                         ItemPurchase.item_id, ItemPurchase.bar_code, ItemPurchase.name,
+                         ItemPurchase.price, ItemPurchase.quantity, ItemPurchase.total) \
+        .join(ItemPurchase, ItemPurchase.purchase_id == Purchase.id) \
+        .order_by(Purchase.id, ItemPurchase.item_id)
+
+EXPORTS = {
+    'items': _export_items,
+    'stock': _export_stock,
+    'purchases': _export_purchases,
+}
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def export_records(kind: str, format: str, batch_size: int = BATCH_SIZE):
+    """Writes the rows of an export one chunk at a time
+    Parameters
+    ----------
+    kind: str
+        items, stock or purchases (one row per purchased item)
+    format: str
+        csv or jsonl
+    batch_size: int
+        the number of rows fetched from the database and written per chunk
+    Yields
+    ------
+    str
+        the next chunk of the file
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f'Unknown export {kind!r}, use one of {", ".join(EXPORTS)}')
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format!r}, use one of {", ".join(FORMATS)}')
+    columns, query = EXPORTS[kind]()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == 'csv':
+        writer.writerow(columns)
+    count = 0
+    for row in query.yield_per(batch_size):
+        if format == 'csv':
+            writer.writerow([_value(x) for x in row])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, map(_value, row)))))
+            buffer.write('\n')
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
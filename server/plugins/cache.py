@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+class LRUCache:
+    """Bounded in-process cache evicting the least recently used entries
+
+    Each worker process has its own copy of the cache, entries can expire
+    after a time to live so changes made by other workers are picked up.
+    ...
+    Methods
+    -------
+    get(self, key, default=None)
+        returns the cached value of the key
+    set(self, key, value)
+        caches the value of the key
+    pop(self, key, default=None)
+        removes the key from the cache and returns its value
+    clear(self)
+        removes every entry of the cache
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        """Initializes the cache
+        Parameters
+        ----------
+        maxsize: int
+            the maximum number of entries
+        ttl: float, optional
+            the seconds an entry is kept, entries never expire when not specified
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Returns the cached value of the key
+        Parameters
+        ----------
+        key: Hashable
+            the key of the entry
+        default: Any, optional
+            returned when the key is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        """Caches the value of the key
+        Parameters
+        ----------
+        key: Hashable
+            the key of the entry
+        value: Any
+            the value to cache
+        """
+        if self.maxsize <= 0:
+            return
+        expires = monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Removes the key from the cache
+        Parameters
+        ----------
+        key: Hashable
+            the key of the entry
+        default: Any, optional
+            returned when the key is not cached
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        "Removes every entry of the cache"
+        with self._lock:
+            self._entries.clear()
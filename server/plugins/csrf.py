@@ -1,7 +1,9 @@
+import hmac
+import time
 from hashlib import sha256
 from uuid import uuid4
 
-from flask import abort, request, Response, session
+from flask import abort, g, request, Response, session
 
 class CSRFProtect:
     """Simple CSRF implementation for flask application
@@ -12,6 +14,11 @@ class CSRFProtect:
         initializes the model
     init_app(self, app)
         initializes the app with CSRFProtect
+
+    With ``CSRF_TOKEN_MODE`` set to ``'hmac'`` the tokens are derived from
+    the session id and a time bucket of ``CSRF_TIME_LIMIT`` seconds, so
+    rendering a token doesn't write to the session. The default
+    ``'session'`` mode stores a token in the session on every render.
     """
     def __init__(self, app=None):
         """Initializes the model
@@ -37,7 +44,10 @@ class CSRFProtect:
 
     def init_bindings(self):
         "Binds the anti csrf functions to the application"
+        self.app.config.setdefault('CSRF_TOKEN_MODE', 'session')
+        self.app.config.setdefault('CSRF_TIME_LIMIT', 3600)
         self.app.before_request(self.verify_token)
+        self.app.after_request(self.set_nonce_cookie)
         self.app.jinja_env.globals['csrf_token'] = self.set_token
 
     def get_token(self) -> str:
@@ -75,8 +85,65 @@ class CSRFProtect:
         bool
             result of the matching
         """
+        if self.app.config['CSRF_TOKEN_MODE'] == 'hmac':
+            return self.verify_hmac(token)
         return self.hash_token(session.get('csrftoken','')) == token
-    
+
+    def identity(self, create: bool = False) -> str:
+        """Gets the value the hmac tokens are bound to
+
+        This is the session id once the session holds data, otherwise a
+        random nonce kept in the ``csrf_nonce`` cookie.
+        Parameters
+        ----------
+        create: bool
+            creates the nonce when the client doesn't have one
+        Returns
+        -------
+        str
+            the identity, empty when there is none
+        """
+        sid = getattr(session, 'sid', None)
+        if session and sid:
+            return 'sid:' + sid
+        nonce = g.get('csrf_nonce') or request.cookies.get('csrf_nonce')
+        if not nonce and create:
+            nonce = g.csrf_nonce = uuid4().hex
+        return 'nonce:' + nonce if nonce else ''
+
+    def hmac_token(self, identity: str, bucket: int) -> str:
+        """Signs the identity for the given time bucket
+        Parameters
+        ----------
+        identity: str
+            the value the token is bound to
+        bucket: int
+            the time bucket the token is valid in
+        Returns
+        -------
+        str
+            the client csrf token
+        """
+        message = f'{identity}:{bucket}'.encode()
+        key = self.app.config['SECRET_KEY'].encode()
+        return hmac.new(key, message, sha256).hexdigest()
+
+    def verify_hmac(self, token) -> bool:
+        """Matches the token against the current and previous time bucket
+        Returns
+        -------
+        bool
+            result of the matching
+        """
+        identity = self.identity()
+        if not token or not identity:
+            return False
+        bucket = int(time.time() // self.app.config['CSRF_TIME_LIMIT'])
+        return any(
+            hmac.compare_digest(self.hmac_token(identity, b), token)
+            for b in (bucket, bucket - 1)
+        )
+
     def set_token(self) -> str:
         """Sets the csrf token in the server
         Returns
@@ -84,6 +151,9 @@ class CSRFProtect:
         str
             the client csrf token
         """
+        if self.app.config['CSRF_TOKEN_MODE'] == 'hmac':
+            bucket = int(time.time() // self.app.config['CSRF_TIME_LIMIT'])
+            return self.hmac_token(self.identity(create=True), bucket)
         server, client = self.create()
         session['csrftoken'] = server
         return client
@@ -97,4 +167,14 @@ class CSRFProtect:
             request.cookies.get('csrf_token'))
         )
         if not self.verify(client_token):
-            return Response('Invalid CSRF Token'), 401
\ No newline at end of file
+            return Response('Invalid CSRF Token'), 401
+
+    def set_nonce_cookie(self, response):
+        "Sends the nonce created for anonymous tokens to the client"
+        nonce = g.get('csrf_nonce')
+        if nonce:
+            response.set_cookie(
+                'csrf_nonce', nonce, httponly=True, samesite='Lax',
+                secure=self.app.config.get('SESSION_COOKIE_SECURE', False),
+            )
+        return response
@@ -13,9 +13,11 @@ __version__ = '0.4.0'
 
 import os
 
+from .serializers import serializers
 from .sessions import NullSessionInterface, RedisSessionInterface, \
     MemcachedSessionInterface, FileSystemSessionInterface, \
-    MongoDBSessionInterface, SqlAlchemySessionInterface
+    MongoDBSessionInterface, SqlAlchemySessionInterface, \
+    CachedSessionInterface
 
 
 class Session(object):
@@ -77,6 +79,10 @@ class Session(object):
         config.setdefault('SESSION_MONGODB_COLLECT', 'sessions')
         config.setdefault('SESSION_SQLALCHEMY', None)
         config.setdefault('SESSION_SQLALCHEMY_TABLE', 'sessions')
+        config.setdefault('SESSION_REFRESH_RATIO', 0.5)
+        config.setdefault('SESSION_SERIALIZER', 'pickle')
+        config.setdefault('SESSION_CACHE_SIZE', 0)
+        config.setdefault('SESSION_CACHE_TTL', 5)
 
         if config['SESSION_TYPE'] == 'redis':
             session_interface = RedisSessionInterface(
@@ -102,8 +108,16 @@ class Session(object):
                 app, config['SESSION_SQLALCHEMY'],
                 config['SESSION_SQLALCHEMY_TABLE'],
                 config['SESSION_KEY_PREFIX'], config['SESSION_USE_SIGNER'],
-                config['SESSION_PERMANENT'])
+                config['SESSION_PERMANENT'], config['SESSION_REFRESH_RATIO'])
         else:
             session_interface = NullSessionInterface()
 
+        if hasattr(session_interface, 'serializer'):
+            session_interface.serializer = \
+                serializers[config['SESSION_SERIALIZER']]()
+        if config['SESSION_CACHE_SIZE'] > 0 and \
+                not isinstance(session_interface, NullSessionInterface):
+            session_interface = CachedSessionInterface(
+                session_interface, config['SESSION_CACHE_SIZE'],
+                config['SESSION_CACHE_TTL'])
         return session_interface
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_session.serializers
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Serializers turning session data into the bytes stored by the backends.
+"""
+import json
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+class PickleSerializer(object):
+    """Stores sessions with :mod:`pickle`, handles any picklable value."""
+
+    def dumps(self, data, *args):
+        return pickle.dumps(data, *args)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _check_json(value):
+    # JSON would silently turn tuples into lists and keys into strings
+    if type(value) in _SCALARS:
+        return
+    if type(value) is list:
+        for item in value:
+            _check_json(item)
+    elif type(value) is dict:
+        for key, item in value.items():
+            if type(key) is not str:
+                raise TypeError(type(key).__name__)
+            _check_json(item)
+    else:
+        raise TypeError(type(value).__name__)
+
+
+class CompactSerializer(object):
+    """Stores sessions as a version byte followed by compact UTF-8 JSON.
+
+    Only sessions made of ``None``, booleans, numbers, strings, lists and
+    dicts with string keys are stored as JSON, which keeps them a little
+    smaller than pickle and readable by any Python version.  Encoding and
+    decoding are done by the C accelerated :mod:`json` module but remain
+    slower than pickle (see ``benchmarks/session_serializer.py``).  Sessions
+    holding other values, such as the tuples of flashed messages, are stored
+    with pickle.  Payloads without the version byte are read as pickle, so
+    existing sessions keep working until their next write.
+    """
+
+    version = b'\x02'
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or PickleSerializer()
+        self.encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False,
+                                        separators=(',', ':'))
+        self.decoder = json.JSONDecoder()
+
+    def dumps(self, data, *args):
+        try:
+            _check_json(data)
+            payload = self.encoder.encode(data).encode('utf-8')
+        except (TypeError, UnicodeEncodeError):
+            # unsupported value or lone surrogate
+            return self.fallback.dumps(data, *args)
+        return self.version + payload
+
+    def loads(self, data):
+        if data[:1] != self.version:
+            return self.fallback.loads(data)
+        return self.decoder.decode(data[1:].decode('utf-8'))
+
+
+serializers = {
+    'pickle': PickleSerializer,
+    'compact': CompactSerializer,
+}
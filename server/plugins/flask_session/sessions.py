@@ -11,6 +11,7 @@
 import sys
 import time
 from datetime import datetime
+from hashlib import sha1
 from uuid import uuid4
 try:
     import cPickle as pickle
@@ -19,6 +20,9 @@ except ImportError:
 
 from flask.sessions import SessionInterface as FlaskSessionInterface
 from flask.sessions import SessionMixin
+from sqlalchemy import select
+
+from ..cache import LRUCache
 from werkzeug.datastructures import CallbackDict
 from itsdangerous import Signer, BadSignature, want_bytes
 
@@ -45,6 +49,9 @@ class ServerSideSession(CallbackDict, SessionMixin):
         if permanent:
             self.permanent = permanent
         self.modified = False
+        # digest and expiry of the stored copy, used to skip unneeded writes
+        self.stored_digest = None
+        self.stored_expiry = None
 
 
 class RedisSession(ServerSideSession):
@@ -79,6 +86,25 @@ class SessionInterface(FlaskSessionInterface):
                       key_derivation='hmac')
 
 
+    def _get_stored_sid(self, app, request):
+        """Returns the session id from the cookie, or ``None`` when missing
+        or badly signed."""
+        sid = request.cookies.get(app.session_cookie_name)
+        if not sid:
+            return None
+        if self.use_signer:
+            signer = self._get_signer(app)
+            if signer is None:
+                return None
+            try:
+                sid = signer.unsign(sid).decode()
+            except BadSignature:
+                return None
+        if not PY2 and not isinstance(sid, text_type):
+            sid = sid.decode('utf-8', 'strict')
+        return sid
+
+
 class NullSessionInterface(SessionInterface):
     """Used to open a :class:`flask.sessions.NullSession` instance.
     """
@@ -472,19 +498,25 @@ class SqlAlchemySessionInterface(SessionInterface):
 
     .. versionadded:: 0.2
 
+    The stored row is only written when the session data changed or when
+    less than ``refresh_ratio`` of the session lifetime is left before it
+    expires, writes are a single UPSERT.
+
     :param app: A Flask app instance.
     :param db: A Flask-SQLAlchemy instance.
     :param table: The table name you want to use.
     :param key_prefix: A prefix that is added to all store keys.
     :param use_signer: Whether to sign the session id cookie or not.
     :param permanent: Whether to use permanent session or not.
+    :param refresh_ratio: The fraction of the lifetime left at which the
+                          expiry of an unchanged session is extended.
     """
 
     serializer = pickle
     session_class = SqlAlchemySession
 
     def __init__(self, app, db, table, key_prefix, use_signer=False,
-                 permanent=True):
+                 permanent=True, refresh_ratio=0.5):
         if db is None:
             from flask_sqlalchemy import SQLAlchemy
             db = SQLAlchemy(app)
@@ -492,6 +524,7 @@ class SqlAlchemySessionInterface(SessionInterface):
         self.key_prefix = key_prefix
         self.use_signer = use_signer
         self.permanent = permanent
+        self.refresh_ratio = refresh_ratio
         self.has_same_site_capability = hasattr(self, "get_cookie_samesite")
 
         class Session(self.db.Model):
@@ -500,7 +533,7 @@ class SqlAlchemySessionInterface(SessionInterface):
             id = self.db.Column(self.db.Integer, primary_key=True)
             session_id = self.db.Column(self.db.String(255), unique=True)
             data = self.db.Column(self.db.LargeBinary)
-            expiry = self.db.Column(self.db.DateTime)
+            expiry = self.db.Column(self.db.DateTime, index=True)
 
             def __init__(self, session_id, data, expiry):
                 self.session_id = session_id
@@ -530,33 +563,97 @@ class SqlAlchemySessionInterface(SessionInterface):
                 return self.session_class(sid=sid, permanent=self.permanent)
 
         store_id = self.key_prefix + sid
-        saved_session = self.sql_session_model.query.filter_by(
-            session_id=store_id).first()
-        saved_expiry = saved_session.expiry if saved_session else None
-        if saved_expiry and saved_expiry <= datetime.utcnow():
+        model = self.sql_session_model
+        saved_session = self.db.session.query(model.data, model.expiry) \
+            .filter(model.session_id == store_id).first()
+        if saved_session and saved_session.expiry and \
+                saved_session.expiry <= datetime.utcnow():
             # Delete expired session
-            self.db.session.delete(saved_session)
+            self.db.session.execute(
+                model.__table__.delete().where(model.session_id == store_id))
             self.db.session.commit()
             saved_session = None
         if saved_session:
             try:
-                val = saved_session.data
-                data = self.serializer.loads(want_bytes(val))
-                return self.session_class(data, sid=sid)
+                val = want_bytes(saved_session.data)
+                data = self.serializer.loads(val)
+                session = self.session_class(data, sid=sid)
+                session.stored_digest = sha1(val).digest()
+                session.stored_expiry = saved_session.expiry
+                return session
             except:
                 return self.session_class(sid=sid, permanent=self.permanent)
         return self.session_class(sid=sid, permanent=self.permanent)
 
+    def purge_expired(self, batch_size=500):
+        """Deletes the expired sessions in batches.
+
+        Each batch is committed on its own so the write lock is only held
+        briefly.
+
+        :param batch_size: The number of sessions deleted per batch.
+        :return: The number of purged sessions and the seconds it took.
+        """
+        started = time.perf_counter()
+        table = self.sql_session_model.__table__
+        purged = 0
+        while True:
+            now = datetime.utcnow()
+            ids = [row.id for row in self.db.session.execute(
+                select(table.c.id).where(table.c.expiry <= now)
+                .limit(batch_size))]
+            if ids:
+                self.db.session.execute(
+                    table.delete().where(table.c.id.in_(ids)))
+                self.db.session.commit()
+                purged += len(ids)
+            if len(ids) < batch_size:
+                break
+        self.db.session.commit()
+        return purged, time.perf_counter() - started
+
+    def _needs_refresh(self, app, session):
+        """Whether the stored expiry of the session is close to running out."""
+        if session.stored_expiry is None:
+            return True
+        lifetime = total_seconds(app.permanent_session_lifetime)
+        remaining = total_seconds(session.stored_expiry - datetime.utcnow())
+        return remaining < lifetime * self.refresh_ratio
+
+    def _upsert(self, store_id, val, expiry):
+        table = self.sql_session_model.__table__
+        dialect = self.db.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table).values(
+                session_id=store_id, data=val, expiry=expiry)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.session_id],
+                set_={'data': statement.excluded.data,
+                      'expiry': statement.excluded.expiry})
+            self.db.session.execute(statement)
+        else:
+            updated = self.db.session.execute(
+                table.update().where(table.c.session_id == store_id)
+                .values(data=val, expiry=expiry))
+            if updated.rowcount == 0:
+                self.db.session.execute(table.insert().values(
+                    session_id=store_id, data=val, expiry=expiry))
+        self.db.session.commit()
+
     def save_session(self, app, session, response):
         domain = self.get_cookie_domain(app)
         path = self.get_cookie_path(app)
         store_id = self.key_prefix + session.sid
-        saved_session = self.sql_session_model.query.filter_by(
-            session_id=store_id).first()
         if not session:
             if session.modified:
-                if saved_session:
-                    self.db.session.delete(saved_session)
+                if session.stored_digest is not None:
+                    table = self.sql_session_model.__table__
+                    self.db.session.execute(
+                        table.delete().where(table.c.session_id == store_id))
                     self.db.session.commit()
                 response.delete_cookie(app.session_cookie_name,
                                        domain=domain, path=path)
@@ -568,15 +665,20 @@ class SqlAlchemySessionInterface(SessionInterface):
         if self.has_same_site_capability:
             conditional_cookie_kwargs["samesite"] = self.get_cookie_samesite(app)
         expires = self.get_expiration_time(app, session)
-        val = self.serializer.dumps(dict(session))
-        if saved_session:
-            saved_session.data = val
-            saved_session.expiry = expires
-            self.db.session.commit()
-        else:
-            new_session = self.sql_session_model(store_id, val, expires)
-            self.db.session.add(new_session)
-            self.db.session.commit()
+        write = self._needs_refresh(app, session)
+        if session.modified or write:
+            val = self.serializer.dumps(dict(session))
+            digest = sha1(val).digest()
+            if write or digest != session.stored_digest:
+                # non permanent sessions still expire on the server
+                expiry = expires or \
+                    datetime.utcnow() + app.permanent_session_lifetime
+                self._upsert(store_id, val, expiry)
+                session.stored_digest = digest
+                session.stored_expiry = expiry
+        if expires:
+            # the cookie must not outlive the stored session
+            expires = session.stored_expiry
         if self.use_signer:
             session_id = self._get_signer(app).sign(want_bytes(session.sid))
         else:
@@ -585,3 +687,58 @@ class SqlAlchemySessionInterface(SessionInterface):
                             expires=expires, httponly=httponly,
                             domain=domain, path=path, secure=secure,
                             **conditional_cookie_kwargs)
+
+
+class CachedSessionInterface(SessionInterface):
+    """Keeps recently used sessions of another interface in process memory.
+
+    Sessions read from the cache don't touch the wrapped backend, saves are
+    written through to it.  Cached entries are dropped once the stored
+    session expires or after ``ttl`` seconds, so changes made by other
+    workers, like a logout, are visible within ``ttl`` seconds.
+
+    :param backend: The session interface storing the sessions.
+    :param maxsize: The maximum number of cached sessions.
+    :param ttl: The seconds a session is served from the cache.
+    """
+
+    def __init__(self, backend, maxsize=1024, ttl=5):
+        self.backend = backend
+        self.cache = LRUCache(maxsize, ttl)
+        self.use_signer = backend.use_signer
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def open_session(self, app, request):
+        sid = self._get_stored_sid(app, request)
+        entry = self.cache.get(sid) if sid else None
+        if entry is not None:
+            val, digest, expiry = entry
+            if expiry is None or expiry > datetime.utcnow():
+                serializer = getattr(self.backend, 'serializer', pickle)
+                session = self.backend.session_class(
+                    serializer.loads(val), sid=sid)
+                session.stored_digest = digest
+                session.stored_expiry = expiry
+                return session
+            self.cache.pop(sid)
+        session = self.backend.open_session(app, request)
+        if session is not None and session.stored_digest is not None:
+            self._cache_session(session)
+        return session
+
+    def save_session(self, app, session, response):
+        digest = session.stored_digest
+        self.backend.save_session(app, session, response)
+        if not session:
+            self.cache.pop(session.sid)
+        elif session.modified or session.stored_digest != digest or \
+                self.cache.get(session.sid) is None:
+            self._cache_session(session)
+
+    def _cache_session(self, session):
+        serializer = getattr(self.backend, 'serializer', pickle)
+        self.cache.set(session.sid, (serializer.dumps(dict(session)),
+                                     session.stored_digest,
+                                     session.stored_expiry))
@@ -0,0 +1,236 @@
+import re
+import time
+
+from flask import current_app
+from sqlalchemy import case, column, func, literal_column, or_, select, table
+
+from server.models import db, Item
+
+class LikeSearch:
+    """Searches the items with a substring match on the name and bar code
+
+    Works on every database but scans the whole item table, it is used when
+    no indexed backend is available.
+    ...
+    Methods
+    -------
+    available(connection) -> bool
+        checks if the backend can be used on the database
+    search(self, query, term: str)
+        filters and ranks the query with the search term
+    match(self, query, term: str) -> tuple
+        filters the query and returns its order by clauses
+    """
+    name = 'like'
+    # set when the backend stands in for an indexed one whose index is missing
+    fallback = False
+
+    @staticmethod
+    def available(connection) -> bool:
+        """Checks if the backend can be used on the database
+        Parameters
+        ----------
+        connection: sqlalchemy.engine.Connection
+            a connection to the database
+        Returns
+        -------
+        bool
+            whether the index of the backend exists
+        """
+        return True
+
+    @staticmethod
+    def escape(term: str) -> str:
+        """Escapes the wildcards of LIKE patterns
+        Parameters
+        ----------
+        term: str
+            the search term
+        Returns
+        -------
+        str
+            the escaped term
+        """
+        return re.sub(r'([\\%_])', r'\\\1', term)
+
+    def prefix_rank(self, term: str):
+        """Ranks the items starting with the term before the rest
+        Parameters
+        ----------
+        term: str
+            the search term
+        Returns
+        -------
+        sqlalchemy.sql.expression.Case
+            0 for prefix matches and 1 for the others
+        """
+        pattern = f'{self.escape(term)}%'
+        return case((or_(Item.name.ilike(pattern, escape='\\'),
+                         Item.bar_code.ilike(pattern, escape='\\')), 0), else_=1)
+
+    def search(self, query, term: str):
+        """Filters and ranks the query with the search term
+        Parameters
+        ----------
+        query: sqlalchemy.orm.Query
+            a query of items
+        term: str
+            the search term
+        Returns
+        -------
+        sqlalchemy.orm.Query
+            the matching items, prefix matches first
+        """
+        query, keys = self.match(query, term)
+        return query.order_by(*keys)
+
+    def match(self, query, term: str) -> tuple:
+        """Filters the query with the search term
+        Parameters
+        ----------
+        query: sqlalchemy.orm.Query
+            a query of items
+        term: str
+            the search term
+        Returns
+        -------
+        tuple
+            the matching items and their order by clauses, ending with the id
+        """
+        term = term.strip()
+        if not term:
+            return query, (Item.name, Item.id)
+        pattern = f'%{self.escape(term)}%'
+        return query.filter(or_(Item.name.ilike(pattern, escape='\\'),
+                                Item.bar_code.ilike(pattern, escape='\\'))), \
+            (*self.ranking(term), Item.id)
+
+    def ranking(self, term: str) -> tuple:
+        """Order of the matching items
+        Parameters
+        ----------
+        term: str
+            the search term
+        Returns
+        -------
+        tuple
+            the order by clauses
+        """
+        return self.prefix_rank(term), Item.name
+
+
+class TrigramSearch(LikeSearch):
+    """Searches the items on PostgreSQL using the pg_trgm GIN indexes
+
+    The substring match is served by the trigram indexes and the results
+    are ranked by their similarity with the term.
+    """
+    name = 'trigram'
+
+    @staticmethod
+    def available(connection) -> bool:
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").first() is not None
+
+    def ranking(self, term: str) -> tuple:
+        return self.prefix_rank(term), func.similarity(Item.name, term).desc(), Item.name
+
+
+class FullTextSearch(LikeSearch):
+    """Searches the items on SQLite using the item_fts FTS5 trigram table
+
+    The term is matched as a substring of the name or bar code like the other
+    backends, results are ranked with bm25. Terms shorter than a trigram
+    can't use the index and are matched with LIKE.
+    """
+    name = 'fts5'
+    fts_table = table('item_fts', column('rowid'), column('rank'))
+    min_length = 3
+
+    @staticmethod
+    def available(connection) -> bool:
+        # the word tokenizer of older SQLite versions matches word prefixes only
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_fts' "
+            "AND sql LIKE '%trigram%'").first() is not None
+
+    def match(self, query, term: str) -> tuple:
+        term = term.strip()
+        if len(term) < self.min_length:
+            return super().match(query, term)
+        match = '"{}"'.format(term.replace('"', '""'))
+        matches = select(self.fts_table.c.rowid, self.fts_table.c.rank) \
+            .where(literal_column('item_fts').op('MATCH')(match)).subquery()
+        return query.join(matches, matches.c.rowid == Item.id), \
+            (self.prefix_rank(term), matches.c.rank, Item.name, Item.id)
+
+
+BACKENDS = {
+    'like': LikeSearch,
+    'trigram': TrigramSearch,
+    'fts5': FullTextSearch,
+}
+
+# how long a fallback to the LIKE search lasts before looking for the index again
+RECHECK_SECONDS = 60
+
+def select_backend(name: str = 'auto'):
+    """Selects the search backend for the current database
+    Parameters
+    ----------
+    name: str
+        like, trigram, fts5 or auto to pick the indexed backend of the database
+    Returns
+    -------
+    LikeSearch
+        the search backend, falling back to the LIKE search with its fallback
+        attribute set when the index is missing
+    """
+    engine = db.get_engine()
+    if name == 'auto':
+        name = {'sqlite': 'fts5', 'postgresql': 'trigram'}.get(engine.dialect.name, 'like')
+    backend = BACKENDS[name]()
+    with engine.connect() as connection:
+        if not backend.available(connection):
+            current_app.logger.warning(f'{name} item search index is missing, using LIKE search')
+            backend = LikeSearch()
+            backend.fallback = True
+    return backend
+
+def search_items(term: str, query=None):
+    """Searches the items with the configured backend
+    Parameters
+    ----------
+    term: str
+        the search term
+    query: sqlalchemy.orm.Query, optional
+        the query of items to search in
+    Returns
+    -------
+    sqlalchemy.orm.Query
+        the matching items ordered by relevance
+    """
+    query, keys = match_items(term, query)
+    return query.order_by(*keys)
+
+def match_items(term: str, query=None) -> tuple:
+    """Filters the items with the configured backend without ordering them
+    Parameters
+    ----------
+    term: str
+        the search term
+    query: sqlalchemy.orm.Query, optional
+        the query of items to search in
+    Returns
+    -------
+    tuple
+        the matching items and the order by clauses of their relevance,
+        usable as keys of a keyset pagination
+    """
+    backend, expires = current_app.extensions.get('item_search', (None, None))
+    if backend is None or (expires is not None and expires < time.monotonic()):
+        backend = select_backend(current_app.config.get('ITEM_SEARCH_BACKEND', 'auto'))
+        # a missing index may be created by a migration while the app runs
+        expires = time.monotonic() + RECHECK_SECONDS if backend.fallback else None
+        current_app.extensions['item_search'] = backend, expires
+    return backend.match(Item.query if query is None else query, term)
@@ -0,0 +1,97 @@
+from datetime import datetime
+from threading import Lock
+
+from flask import Flask
+from sqlalchemy import bindparam
+from sqlalchemy.exc import SQLAlchemyError
+
+from .cache import LRUCache
+
+class LastAccessTracker:
+    """Write-behind tracker of the users' last access
+
+    The last access of a user is written at most once per interval by each
+    worker, pending timestamps are written together at the end of a request
+    and kept for the next one when the write fails.
+    ...
+    Methods
+    -------
+    __init__(self, app=None)
+        initializes the tracker
+    init_app(self, app)
+        initializes the app with the tracker
+    touch(self, user_id: int)
+        records an access of the user
+    flush(self, exception=None)
+        writes the pending accesses to the database
+    """
+    def __init__(self, app: Flask = None):
+        """Initializes the tracker
+        Parameters
+        ----------
+        app: Flask
+            the flask application
+        """
+        self.app = app
+        self._lock = Lock()
+        self._written = None
+        self._pending = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initializes the app with the tracker
+        Parameters
+        ----------
+        app: Flask
+            the flask application
+        """
+        self.app = app
+        self.interval = app.config.get('LAST_ACCESS_INTERVAL', 300)
+        # the users touched within the interval, the least recent are forgotten first
+        size = app.config.get('LAST_ACCESS_CACHE_SIZE', 4096) if self.interval > 0 else 0
+        self._written = LRUCache(size, self.interval)
+        app.extensions['last_access'] = self
+        app.teardown_request(self.flush)
+
+    def touch(self, user_id: int):
+        """Records an access of the user
+        Parameters
+        ----------
+        user_id: int
+            the id of the user
+        """
+        with self._lock:
+            if self._written.get(user_id) is not None:
+                return
+            self._written.set(user_id, True)
+            self._pending[user_id] = datetime.utcnow()
+
+    def flush(self, exception=None):
+        """Writes the pending accesses to the database in a single statement
+
+        The write goes through the request's session so it reuses the
+        connection the request already holds instead of taking another one
+        from the pool, the work the view left uncommitted is rolled back first.
+        """
+        if not self._pending:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        from server.models import db, User
+        table = User.__table__
+        statement = table.update().where(table.c.id == bindparam('user_id')) \
+            .values(last_access=bindparam('accessed_on'))
+        try:
+            db.session.rollback()
+            db.session.execute(statement, [
+                {'user_id': user_id, 'accessed_on': accessed_on}
+                for user_id, accessed_on in pending.items()
+            ])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            # such as a locked SQLite database, the accesses touched meanwhile are newer
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            self.app.logger.warning('Last access of %d users not written: %s', len(pending), e)
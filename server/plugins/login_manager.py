@@ -1,7 +1,97 @@
 from functools import wraps
-from flask import g, redirect, session, url_for
+from flask import current_app, g, has_app_context, redirect, session, url_for
+from sqlalchemy import event, inspect
 
 from server.models import User
+from .cache import LRUCache
+
+class CurrentUser:
+    """Read-only record of the authenticated user
+
+    ...
+    Attributes
+    ----------
+    id: int
+        id of the user
+    username: str
+        username of the user
+    email: str
+        email of the user
+    """
+    __slots__ = ('id', 'username', 'email')
+
+    def __init__(self, id: int, username: str, email: str):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, 'email', email)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __repr__(self) -> str:
+        return f'<CurrentUser {self.id}>'
+
+def init_user_cache(app):
+    """Creates the authenticated user cache of the application
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    """
+    app.extensions['user_cache'] = LRUCache(
+        app.config.get('USER_CACHE_SIZE', 256),
+        app.config.get('USER_CACHE_TTL', 30),
+    )
+
+def load_user(user_id: int):
+    """Loads the user through the worker's user cache
+    Parameters
+    ----------
+    user_id: int
+        the id of the user
+    Returns
+    -------
+    CurrentUser | None
+        the user when it exists
+    """
+    if user_id is None:
+        return None
+    cache = current_app.extensions['user_cache']
+    user = cache.get(user_id)
+    if user is None:
+        row = User.query.with_entities(User.id, User.username, User.email) \
+            .filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = CurrentUser(*row)
+        cache.set(user_id, user)
+    return user
+
+def current_user():
+    """Gets the logged in user of the request
+    Returns
+    -------
+    CurrentUser | None
+        the logged in user
+    """
+    if not session.get('signed_in', False):
+        return None
+    if 'user' not in g:
+        g.user = load_user(session.get('user_id'))
+    return g.user
+
+@event.listens_for(User, 'after_update')
+def invalidate_changed_user(mapper, connection, target):
+    "Removes the user from the cache when its credentials changed"
+    state = inspect(target)
+    changed = any(state.attrs[key].history.has_changes() for key in ('username', 'email', 'password'))
+    if changed and has_app_context():
+        current_app.extensions['user_cache'].pop(target.id)
+
+@event.listens_for(User, 'after_delete')
+def invalidate_deleted_user(mapper, connection, target):
+    if has_app_context():
+        current_app.extensions['user_cache'].pop(target.id)
 
 def login_user(user: User):
     """Sets the necessary variables in the session for a logged in user
@@ -34,7 +124,7 @@ def login_required(fn):
     """
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        if not session.get('signed_in', False):
+        if current_user() is None:
             return redirect(url_for('main.login'))
         return fn(*args, **kwargs)
     return wrapper
@@ -0,0 +1,205 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from flask import abort, request
+from sqlalchemy import and_, bindparam, or_, tuple_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from .cache import LRUCache
+from .replica import read_primary
+
+_totals = LRUCache(maxsize=256, ttl=60)
+
+def encode_cursor(values) -> str:
+    """Encodes the sort key of a row into an opaque cursor
+    Parameters
+    ----------
+    values: tuple
+        the values of the sort key
+    Returns
+    -------
+    str
+        the url safe cursor
+    """
+    def encode(value):
+        if isinstance(value, datetime):
+            return {'dt': value.isoformat()}
+        if isinstance(value, date):
+            return {'d': value.isoformat()}
+        return value
+    data = json.dumps([encode(x) for x in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decodes a cursor made by encode_cursor, aborts with 400 when invalid
+    Parameters
+    ----------
+    cursor: str
+        the cursor from the client
+    size: int
+        the number of values of the sort key
+    Returns
+    -------
+    list
+        the values of the sort key
+    """
+    def decode(value):
+        if isinstance(value, dict):
+            if 'dt' in value:
+                return datetime.fromisoformat(value['dt'])
+            return date.fromisoformat(value['d'])
+        return value
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = [decode(x) for x in json.loads(data)]
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        abort(400)
+    if len(values) != size:
+        abort(400)
+    return values
+
+def cursor_args() -> dict:
+    """Gets the after and before cursors of the current request
+    Returns
+    -------
+    dict
+        the after and before query arguments
+    """
+    return {
+        'after': request.args.get('after') or None,
+        'before': request.args.get('before') or None,
+    }
+
+
+class KeysetPage:
+    """A page of rows fetched by paginate
+    ...
+    Attributes
+    ----------
+    items: list
+        the rows of the page
+    has_prev: bool
+        whether there are rows before the page
+    has_next: bool
+        whether there are rows after the page
+    total: int, optional
+        the cached number of rows of the whole query
+    prev_cursor: str
+        the before cursor of the previous page
+    next_cursor: str
+        the after cursor of the next page
+    """
+    def __init__(self, items: list, keys: list, has_prev: bool, has_next: bool, total: int = None):
+        self.items = items
+        self.keys = keys
+        self.has_prev = has_prev and bool(keys)
+        self.has_next = has_next and bool(keys)
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @property
+    def prev_cursor(self):
+        return encode_cursor(self.keys[0]) if self.has_prev else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.keys[-1]) if self.has_next else None
+
+
+def _split_key(key) -> tuple:
+    if isinstance(key, UnaryExpression) and key.modifier in (operators.desc_op, operators.asc_op):
+        return key.element, key.modifier is operators.desc_op
+    return key, False
+
+def _beyond(columns, descending, values):
+    values = [bindparam(None, v, type_=c.type) for c, v in zip(columns, values)]
+    if len(set(descending)) == 1:
+        # row values compare lexicographically and can use a composite index
+        left, right = tuple_(*columns), tuple_(*values)
+        return left < right if descending[0] else left > right
+    clauses = []
+    for i, (column, desc) in enumerate(zip(columns, descending)):
+        equal = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal, column < values[i] if desc else column > values[i]))
+    return or_(*clauses)
+
+def paginate(query, keys, per_page: int = 20, after: str = None,
+             before: str = None, count_key=None) -> KeysetPage:
+    """Fetches a page of the query by seeking past its sort key
+
+    Unlike Query.paginate no OFFSET or COUNT(*) is used, so every page costs
+    the same as the first one.
+    Parameters
+    ----------
+    query: sqlalchemy.orm.Query
+        the query to paginate, its own ordering is replaced by the keys
+    keys: tuple
+        the order by clauses, the last one must be unique like the primary key
+    per_page: int
+        the number of rows per page
+    after: str, optional
+        cursor of the row the page starts after
+    before: str, optional
+        cursor of the row the page ends before
+    count_key: hashable, optional
+        counts the rows of the query on the primary and caches the total
+        under this key
+    Returns
+    -------
+    KeysetPage
+        the rows of the page
+    """
+    total = None
+    if count_key is not None:
+        total = _totals.get(count_key)
+        if total is None:
+            # shared by every request of the worker, so counted on the primary
+            with read_primary():
+                total = query.order_by(None).count()
+            _totals.set(count_key, total)
+
+    backwards = bool(before) and not after
+    cursor = before if backwards else after
+    values = decode_cursor(cursor, len(keys)) if cursor else None
+    single = len(query.column_descriptions) == 1
+    rows = keyset_query(query, keys, values, backwards).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    items = [row[0] if single else row for row in rows]
+    row_keys = [tuple(row[-len(keys):]) for row in rows]
+    if backwards:
+        return KeysetPage(items, row_keys, more, True, total)
+    return KeysetPage(items, row_keys, bool(after), more, total)
+
+def keyset_query(query, keys, values=None, backwards: bool = False):
+    """Orders the query by the keys and seeks past the given key values
+    Parameters
+    ----------
+    query: sqlalchemy.orm.Query
+        the query to paginate, its own ordering is replaced by the keys
+    keys: tuple
+        the order by clauses, the last one must be unique like the primary key
+    values: list, optional
+        the key values of the row to seek past
+    backwards: bool
+        seeks and orders in the opposite direction of the keys
+    Returns
+    -------
+    sqlalchemy.orm.Query
+        the query with the key values added as extra columns
+    """
+    columns, descending = zip(*map(_split_key, keys))
+    if backwards:
+        descending = tuple(not x for x in descending)
+    if values is not None:
+        query = query.filter(_beyond(columns, descending, values))
+    return query.order_by(None) \
+        .order_by(*[c.desc() if d else c.asc() for c, d in zip(columns, descending)]) \
+        .add_columns(*[c.label(f'keyset_{i}') for i, c in enumerate(columns)])
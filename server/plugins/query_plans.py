@@ -0,0 +1,118 @@
+import re
+from datetime import datetime
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from server.models import db, Item, ItemPurchase, Purchase, SalesDaily, Stock
+from .item_search import match_items
+from .pagination import keyset_query
+
+# plan lines reading a whole table or index (not a subquery result or a
+# full-text match), or sorting instead of walking an index
+FULL_SCANS = {
+    'sqlite': re.compile(r'^SCAN (?!anon_\d+$)(?!\w+ VIRTUAL TABLE)|USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'Seq Scan on '),
+}
+SORTS = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN statement of a select, EXPLAIN QUERY PLAN on SQLite"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    return 'EXPLAIN ' + compiler.process(element.statement, **kw)
+
+@compiles(Explain, 'sqlite')
+def _compile_explain_sqlite(element, compiler, **kw):
+    return 'EXPLAIN QUERY PLAN ' + compiler.process(element.statement, **kw)
+
+def _keyset(query, keys, values):
+    return keyset_query(query, keys, values).limit(21)
+
+def _search():
+    query, keys = match_items('rice')
+    return query.order_by(*keys).limit(11)
+
+# builders of the queries of the busiest pages and endpoints
+HOT_QUERIES = {
+    'inventory page': lambda: _keyset(
+        Stock.query, (Stock.added_on.desc(), Stock.id.desc()), [datetime.utcnow(), 0]),
+    'purchases page': lambda: _keyset(
+        Purchase.query, (Purchase.added_on.desc(), Purchase.id.desc()), [datetime.utcnow(), 0]),
+    'items page': lambda: _keyset(
+        Item.query, (Item.name.desc(), Item.id.desc()), ['', 0]),
+    'item stock page': lambda: _keyset(
+        Stock.query.filter(Stock.item_id == 0), (Stock.added_on.desc(), Stock.id.desc()),
+        [datetime.utcnow(), 0]),
+    'item purchase history': lambda: _keyset(
+        Item(id=0).purchase_history(), (ItemPurchase.purchase_id.desc(),), [0]),
+    'receipt lines': lambda: ItemPurchase.query.filter(ItemPurchase.purchase_id == 0),
+    'purchase by reference id': lambda: Purchase.query.filter(Purchase.reference_id == ''),
+    'bar code scan': lambda: Item.query.filter(Item.bar_code == ''),
+    'item search': _search,
+    'dashboard most sales': lambda: Item.sales_ranking(SalesDaily.revenue),
+    'dashboard most sold': lambda: Item.sales_ranking(SalesDaily.quantity),
+}
+# ordered by a computed score (relevance, totals), their matches are sorted
+RANKED = {'item search', 'dashboard most sales', 'dashboard most sold'}
+
+def hot_queries() -> dict:
+    """Builds the queries of the busiest pages and endpoints
+    Returns
+    -------
+    dict
+        the sqlalchemy.orm.Query objects keyed by a description
+    """
+    return {name: build() for name, build in HOT_QUERIES.items()}
+
+def explain(query) -> list:
+    """Gets the query plan of a query
+    Parameters
+    ----------
+    query: sqlalchemy.orm.Query
+        the query to explain
+    Returns
+    -------
+    list
+        the lines of the plan
+    """
+    engine = db.get_engine()
+    with engine.begin() as connection:
+        if engine.dialect.name == 'postgresql':
+            # small tables are always read sequentially unless told otherwise
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            return [row[0] for row in connection.execute(Explain(query.statement))]
+        return [row[-1] for row in connection.execute(Explain(query.statement))]
+
+def check_plan(name: str) -> tuple:
+    """Explains a hot query and finds its full scans
+    Parameters
+    ----------
+    name: str
+        the key of the query in HOT_QUERIES
+    Returns
+    -------
+    tuple
+        the plan lines and the full scan lines of the query
+    """
+    pattern = FULL_SCANS.get(db.get_engine().dialect.name)
+    plan = explain(HOT_QUERIES[name]())
+    scans = [line for line in plan if pattern and pattern.search(line.strip())
+             and not (name in RANKED and SORTS.search(line))]
+    return plan, scans
+
+def check_plans() -> dict:
+    """Explains the hot queries and finds their full scans
+    Returns
+    -------
+    dict
+        the plan lines and the full scan lines of each hot query
+    """
+    return {name: check_plan(name) for name in HOT_QUERIES}
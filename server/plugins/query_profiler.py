@@ -0,0 +1,184 @@
+import random
+from time import perf_counter
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class RequestProfile:
+    """SQL statements executed while handling a sampled request
+    ...
+    Attributes
+    ----------
+    started: float
+        perf_counter value at the start of the request
+    count: int
+        number of executed statements
+    duration: float
+        seconds spent executing the statements
+    shapes: dict
+        the number of executions and seconds of each distinct statement
+    slowest: list
+        the seconds and text of the slowest statements, slowest first
+    """
+    def __init__(self, top: int):
+        self.started = perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+        self.slowest = []
+        self.top = top
+
+    def record(self, statement: str, elapsed: float):
+        """Records an executed statement
+        Parameters
+        ----------
+        statement: str
+            the statement, its parameters are bound so repeated executions
+            with other values have the same text
+        elapsed: float
+            the seconds the execution took
+        """
+        self.count += 1
+        self.duration += elapsed
+        shape = self.shapes.get(statement)
+        if shape is None:
+            self.shapes[statement] = [1, elapsed]
+        else:
+            shape[0] += 1
+            shape[1] += elapsed
+        if len(self.slowest) < self.top or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, statement))
+            self.slowest.sort(key=lambda x: x[0], reverse=True)
+            del self.slowest[self.top:]
+
+    def repeated(self, threshold: int) -> list:
+        """Gets the statements executed at least threshold times
+        Parameters
+        ----------
+        threshold: int
+            the minimum number of executions
+        Returns
+        -------
+        list
+            the executions, seconds and text of the statements
+        """
+        return sorted(
+            ((count, elapsed, statement) for statement, (count, elapsed) in self.shapes.items()
+             if count >= threshold),
+            reverse=True,
+        )
+
+
+class QueryProfiler:
+    """Profiles the SQL statements of a sample of the requests
+
+    The query count and database time of sampled requests are sent in the
+    Server-Timing header, slow requests, slow statements and statements
+    repeated within a request (usually N+1 queries) are logged.
+    ...
+    Methods
+    -------
+    __init__(self, app=None)
+        initializes the profiler
+    init_app(self, app)
+        initializes the app with the profiler
+    start(self)
+        starts profiling a sample of the requests
+    finish(self, response)
+        reports the profile of the request
+    """
+    def __init__(self, app: Flask = None):
+        """Initializes the profiler
+        Parameters
+        ----------
+        app: Flask
+            the flask application
+        """
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initializes the app with the profiler
+        Parameters
+        ----------
+        app: Flask
+            the flask application
+        """
+        self.app = app
+        self.sample_rate = app.config.get('SQL_PROFILE_SAMPLE_RATE', 0.0)
+        self.slow_request = app.config.get('SQL_PROFILE_SLOW_REQUEST_MS', 250) / 1000
+        self.slow_query = app.config.get('SQL_PROFILE_SLOW_QUERY_MS', 100) / 1000
+        self.repeat_threshold = app.config.get('SQL_PROFILE_REPEAT_THRESHOLD', 5)
+        self.top = app.config.get('SQL_PROFILE_TOP', 3)
+        app.extensions['query_profiler'] = self
+        if self.sample_rate <= 0:
+            return
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def start(self):
+        "Starts profiling a sample of the requests"
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            g.sql_profile = RequestProfile(self.top)
+
+    def finish(self, response):
+        """Reports the profile of the request
+        Parameters
+        ----------
+        response: Response
+            the response of the request
+        Returns
+        -------
+        Response
+            the response with the Server-Timing header
+        """
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        total = perf_counter() - profile.started
+        response.headers.add('Server-Timing', (
+            f'db;dur={profile.duration * 1000:.2f};desc="{profile.count} queries", '
+            f'app;dur={(total - profile.duration) * 1000:.2f}'
+        ))
+
+        problems = []
+        if total >= self.slow_request:
+            problems.append(f'slow request {total * 1000:.1f}ms')
+        slow = [x for x in profile.slowest if x[0] >= self.slow_query]
+        if slow:
+            problems.append(f'{len(slow)} slow queries')
+        repeated = profile.repeated(self.repeat_threshold)
+        if repeated:
+            problems.append(f'{len(repeated)} repeated queries')
+        if not problems:
+            return response
+
+        lines = [
+            f'SQL profile of {request.method} {request.path} ({request.endpoint}): '
+            f'{", ".join(problems)}, {profile.count} queries in {profile.duration * 1000:.1f}ms'
+        ]
+        lines.extend(f'  slowest {elapsed * 1000:.1f}ms: {_shorten(statement)}'
+                     for elapsed, statement in profile.slowest)
+        lines.extend(f'  repeated {count}x {elapsed * 1000:.1f}ms: {_shorten(statement)}'
+                     for count, elapsed, statement in repeated)
+        self.app.logger.warning('\n'.join(lines))
+        return response
+
+
+def _shorten(statement: str, length: int = 200) -> str:
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + '...'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_profile' in g:
+        conn.info.setdefault('sql_profile_started', []).append(perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('sql_profile_started')
+    if started and has_request_context() and 'sql_profile' in g:
+        g.sql_profile.record(statement, perf_counter() - started.pop())
@@ -0,0 +1,70 @@
+from flask import current_app, has_app_context, render_template
+from markupsafe import Markup
+from sqlalchemy import event
+
+from server.models import ItemPurchase, Purchase
+from .cache import LRUCache
+
+def init_receipt_cache(app) -> None:
+    """Creates the rendered receipt cache of the application
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    """
+    app.extensions['receipt_cache'] = LRUCache(
+        app.config.get('RECEIPT_CACHE_SIZE', 512),
+        app.config.get('RECEIPT_CACHE_TTL', None),
+    )
+
+def render_receipt(purchase_id: int, reference_id: str) -> Markup:
+    """Renders the receipt of a purchase, reusing the cached rendering
+    Parameters
+    ----------
+    purchase_id: int
+        the id of the purchase
+    reference_id: str
+        the reference id of the purchase
+    Returns
+    -------
+    Markup
+        the rendered receipt
+    """
+    cache = current_app.extensions['receipt_cache']
+    entry = cache.get(purchase_id)
+    if entry is not None and entry[0] == reference_id:
+        return entry[1]
+    purchase = Purchase.query.get(purchase_id)
+    result = Markup(render_template(
+        'main/partials/receipt.html',
+        purchase=purchase,
+        lines=purchase.receipt_lines(),
+    ))
+    cache.set(purchase_id, (reference_id, result))
+    return result
+
+def invalidate_receipts(*purchase_ids: int) -> None:
+    """Removes the receipts of the purchases from the cache, every receipt
+    when no purchase is given
+    Parameters
+    ----------
+    purchase_ids: int
+        the ids of the changed purchases
+    """
+    if not has_app_context() or 'receipt_cache' not in current_app.extensions:
+        return
+    cache = current_app.extensions['receipt_cache']
+    if not purchase_ids:
+        cache.clear()
+        return
+    for purchase_id in purchase_ids:
+        cache.pop(purchase_id)
+
+
+@event.listens_for(Purchase, 'after_delete')
+def purchase_deleted(mapper, connection, target):
+    invalidate_receipts(target.id)
+
+@event.listens_for(ItemPurchase, 'after_delete')
+def receipt_line_deleted(mapper, connection, target):
+    invalidate_receipts(target.purchase_id)
@@ -0,0 +1,132 @@
+import sqlite3
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Flask, current_app, g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import orm
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+
+class RoutingSession(SignallingSession):
+    """Session sending the reads of replica requests to the read replica
+
+    Flushes, DML statements, locking selects and explicit connections stay on
+    the primary, and once a request wrote its remaining reads go there too so
+    it sees its own writes.
+    """
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or isinstance(clause, UpdateBase):
+            if has_request_context():
+                g.db_wrote = True
+        elif clause is not None and _reads_from_replica(self.app) \
+                and getattr(clause, 'is_select', False) \
+                and getattr(clause, '_for_update_arg', None) is None:
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    "Flask-SQLAlchemy using the RoutingSession"
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def has_replica(app: Flask) -> bool:
+    """Checks if a read replica is configured
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    Returns
+    -------
+    bool
+        whether SQLALCHEMY_BINDS has a replica bind
+    """
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+def _reads_from_replica(app: Flask) -> bool:
+    return has_request_context() and g.get('db_replica', False) \
+        and not g.get('db_wrote', False) and has_replica(app)
+
+def use_replica() -> None:
+    "Sends the reads of the current request to the replica, unless the client wrote recently"
+    g.db_replica = current_app.config.get('REPLICA_COOKIE_NAME', 'db_primary') not in request.cookies
+
+@contextmanager
+def read_primary():
+    """Sends the reads inside the block to the primary
+
+    For results kept in the worker caches, which must not hold what the
+    replica has not caught up with yet.
+    """
+    if not has_request_context():
+        yield
+        return
+    replica = g.get('db_replica', False)
+    g.db_replica = False
+    try:
+        yield
+    finally:
+        g.db_replica = replica
+
+def read_replica(view):
+    """Decorator sending the reads of a read-only view to the replica
+    Parameters
+    ----------
+    view: Callable
+        the view function
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+def init_replica(app: Flask) -> None:
+    """Keeps the clients that wrote on the primary for REPLICA_STICKY_SECONDS so
+    their next requests read their own writes while the replica catches up
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    """
+    if not has_replica(app):
+        return
+    cookie_name = app.config.get('REPLICA_COOKIE_NAME', 'db_primary')
+    sticky = app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote', False):
+            response.set_cookie(cookie_name, '1', max_age=sticky, httponly=True, samesite='Lax')
+        return response
+
+def sync_sqlite_replica(primary_uri: str, replica_uri: str) -> None:
+    """Copies a SQLite primary database into its replica file
+
+    Stands in for replication when trying the replica routing locally.
+    Parameters
+    ----------
+    primary_uri: str
+        the URI of the primary database
+    replica_uri: str
+        the URI of the replica database
+    Raises
+    ------
+    ValueError
+        raised when either database is not a SQLite file
+    """
+    primary, replica = make_url(primary_uri), make_url(replica_uri)
+    if not (primary.get_backend_name() == replica.get_backend_name() == 'sqlite'
+            and primary.database and replica.database):
+        raise ValueError('Only SQLite file databases can be synced, use database replication otherwise')
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
@@ -0,0 +1,31 @@
+from flask import Flask, current_app
+
+from .tasks import PeriodicTask
+
+def purge_sessions(batch_size: int = 500) -> tuple:
+    """Deletes the expired server-side sessions
+    Parameters
+    ----------
+    batch_size: int
+        the number of sessions deleted per transaction
+    Returns
+    -------
+    tuple
+        the number of purged sessions and the seconds it took
+    """
+    purged, elapsed = current_app.session_interface.purge_expired(batch_size)
+    current_app.logger.info(f'Purged {purged} expired sessions in {elapsed:.3f}s')
+    return purged, elapsed
+
+def init_session_sweeper(app: Flask) -> None:
+    """Schedules the expired session sweeper when SESSION_SWEEP_INTERVAL is set
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    """
+    if not hasattr(app.session_interface, 'purge_expired'):
+        return
+    batch_size = app.config.get('SESSION_SWEEP_BATCH_SIZE', 500)
+    PeriodicTask(app, 'session-sweeper', app.config.get('SESSION_SWEEP_INTERVAL', 0),
+                 lambda: purge_sessions(batch_size))
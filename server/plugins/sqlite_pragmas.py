@@ -0,0 +1,70 @@
+from flask import Flask, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .tasks import PeriodicTask
+
+def apply_pragmas(dbapi_connection, pragmas: dict) -> None:
+    """Sets the pragmas of a new SQLite connection
+    Parameters
+    ----------
+    dbapi_connection: sqlite3.Connection
+        the connection opened by the driver
+    pragmas: dict
+        the values keyed by pragma name, applied in order
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if not name.isidentifier():
+                raise ValueError(f'Invalid SQLite pragma {name!r}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+def sqlite_maintenance(engine: Engine, checkpoint_mode: str = 'PASSIVE') -> tuple:
+    """Checkpoints the write-ahead log and refreshes the query planner statistics
+    Parameters
+    ----------
+    engine: Engine
+        the SQLite engine
+    checkpoint_mode: str
+        PASSIVE never blocks the other connections, RESTART and TRUNCATE wait
+        for the readers to also reset the log
+    Returns
+    -------
+    tuple
+        whether the checkpoint was blocked, the frames in the log and the
+        frames copied to the database
+    """
+    with engine.connect() as connection:
+        result = tuple(connection.exec_driver_sql(f'PRAGMA wal_checkpoint({checkpoint_mode})').first())
+        connection.exec_driver_sql('PRAGMA optimize')
+    current_app.logger.info('SQLite checkpoint: busy=%d log=%d checkpointed=%d', *result)
+    return result
+
+def init_sqlite(app: Flask, engine: Engine, read_only: bool = False) -> None:
+    """Tunes the connections of a SQLite engine with SQLITE_PRAGMAS and schedules
+    its maintenance every SQLITE_MAINTENANCE_INTERVAL seconds
+    Parameters
+    ----------
+    app: Flask
+        the flask application
+    engine: Engine
+        the engine of an application database, ignored when it is not SQLite
+    read_only: bool
+        rejects the writes of the connections, for read replicas which are
+        maintained by their primary
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+    if read_only:
+        pragmas['query_only'] = 1
+    if pragmas:
+        event.listen(engine, 'connect', lambda dbapi_connection, _: apply_pragmas(dbapi_connection, pragmas))
+    if read_only:
+        return
+    checkpoint_mode = app.config.get('SQLITE_CHECKPOINT_MODE', 'PASSIVE')
+    PeriodicTask(app, 'sqlite-maintenance', app.config.get('SQLITE_MAINTENANCE_INTERVAL', 0),
+                 lambda: sqlite_maintenance(engine, checkpoint_mode))
@@ -0,0 +1,61 @@
+import os
+import random
+import time
+from threading import Lock, Thread
+
+from flask import Flask
+
+class PeriodicTask:
+    """Runs a function periodically in a background thread of each worker
+
+    The thread is started by the first request a process handles so it
+    also runs in workers forked after the application was loaded.
+    ...
+    Methods
+    -------
+    __init__(self, app, name, interval, function)
+        initializes the task
+    ensure_started(self)
+        starts the thread of the task in the current process
+    """
+    def __init__(self, app: Flask, name: str, interval: float, function):
+        """Initializes the task
+        Parameters
+        ----------
+        app: Flask
+            the flask application
+        name: str
+            the name of the task used in the logs
+        interval: float
+            the seconds between runs, the task is disabled when not positive
+        function: Callable
+            the function to run inside an application context
+        """
+        self.app = app
+        self.name = name
+        self.interval = interval
+        self.function = function
+        self._pid = None
+        self._lock = Lock()
+        if interval and interval > 0:
+            app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        "Starts the thread of the task in the current process"
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def _run(self):
+        while True:
+            # spread the runs of the workers
+            time.sleep(self.interval * random.uniform(0.9, 1.1))
+            try:
+                with self.app.app_context():
+                    self.function()
+            except Exception:
+                self.app.logger.exception(f'{self.name} task failed')
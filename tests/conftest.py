@@ -0,0 +1,91 @@
+import os
+from contextlib import contextmanager
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import TestingConfig
+from server import create_app, db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+
+class QueryCounter:
+    "Collects the statements executed by every engine"
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries():
+    """Counts the statements executed inside the block
+    Yields
+    ------
+    QueryCounter
+        the executed statements
+    """
+    counter = QueryCounter()
+    event.listen(Engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, 'before_cursor_execute', counter)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    "Application on a migrated database, a temporary SQLite file by default"
+    path = tmp_path_factory.mktemp('db')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('CONFIG_TYPE', 'config.TestingConfig')
+        # TEST_DATABASE_URI runs the tests on another (empty) database such as Postgres
+        database_uri = os.getenv('TEST_DATABASE_URI') or f'sqlite:///{path / "test.db"}'
+        mp.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', database_uri, raising=False)
+        mp.setattr(TestingConfig, 'LOG_FILE', str(path / 'test.log'), raising=False)
+        mp.setattr(TestingConfig, 'CSRF_ENABLED', False, raising=False)
+        mp.setattr(TestingConfig, 'SQL_PROFILE_SAMPLE_RATE', 0, raising=False)
+        app = create_app()
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+    return app
+
+
+@pytest.fixture(scope='session')
+def store(app):
+    "Items with stock and purchases, ids keyed by table"
+    from server.models import Item, Purchase, Stock
+    with app.app_context():
+        items = [Item(name=f'Test Item {i}', price=10 + i, bar_code=f'TEST{i:04d}') for i in range(12)]
+        db.session.add_all(items)
+        db.session.flush()
+        db.session.add_all(Stock(item_id=item.id, quantity=50, per_item_cost=5, cost=250) for item in items)
+        db.session.commit()
+        purchases = []
+        for i in range(12):
+            purchases.append(Purchase.checkout({items[i].id: 1, items[(i + 1) % 12].id: 2}))
+            db.session.commit()
+        return {
+            'items': [item.id for item in items],
+            'purchases': [purchase.id for purchase in purchases],
+        }
+
+
+@pytest.fixture
+def client(app, store):
+    "Client logged in as the default admin"
+    client = app.test_client()
+    response = client.post('/login', data={
+        'username': os.getenv('ADMIN_USERNAME', 'admin'),
+        'password': os.getenv('ADMIN_PASSWORD', 'admin'),
+    })
+    assert response.status_code == 302
+    return client
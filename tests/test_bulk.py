@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from server.models import db, Item
+from server.plugins import bulk
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', '1e999', '-1', '1.5'])
+def test_invalid_quantity(app, store, value):
+    records = [(2, {'item_id': store['items'][0], 'quantity': value, 'cost': '10'})]
+    with app.app_context():
+        report = bulk.import_stock(records)
+    assert report.inserted == 0
+    assert report.errors == [{'line': 2, 'error': 'invalid_value', 'bar_code': None}]
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '1e400'])
+def test_invalid_price(client, value):
+    body = f'bar_code,name,price\nNAN{value},Not A Number,{value}\n'.encode()
+    response = client.post('/api/v1/import/items?format=csv', data=io.BytesIO(body))
+    assert response.status_code == 200
+    assert response.json['result']['errors'] == [{'line': 2, 'error': 'invalid_price', 'bar_code': f'NAN{value}'}]
+
+def test_conflict_keeps_committed_batches(app, store):
+    def records():
+        yield 2, {'bar_code': 'BULK0001', 'name': 'First', 'price': '1'}
+        # another writer takes the bar code of the second batch
+        with db.engine.begin() as connection:
+            connection.execute(Item.__table__.insert(), {'bar_code': 'BULK0002', 'name': 'Other', 'price': 1})
+        yield 3, {'bar_code': 'BULK0002', 'name': 'Second', 'price': '2'}
+        yield 4, {'bar_code': 'BULK0003', 'name': 'Third', 'price': '3'}
+
+    with app.app_context():
+        with pytest.raises(bulk.ImportConflict) as e:
+            bulk.import_items(records(), batch_size=1)
+        assert e.value.report.to_dict()['inserted'] == 1
+        assert e.value.errors == [{'line': 3, 'error': 'duplicate_bar_code', 'bar_code': 'BULK0002'}]
+        names = dict(db.session.query(Item.bar_code, Item.name).filter(Item.bar_code.like('BULK%')))
+    assert names == {'BULK0001': 'First', 'BULK0002': 'Other'}
+
+def test_encoding_error_keeps_committed_batches(app, store):
+    # the reader decodes the file in chunks, the first one is valid
+    body = b'bar_code,name,price\nENC0001,First,1\nENC0002,Second,2\n' + b'x' * 9000 + b'\xff\n'
+    with app.app_context():
+        with pytest.raises(bulk.ImportAborted) as e:
+            bulk.import_items(bulk.read_records(io.BytesIO(body), 'csv'), batch_size=1)
+        assert e.value.report.inserted == 2
+        assert e.value.errors == [{'line': 4, 'error': 'invalid_encoding'}]
+        assert db.session.query(Item).filter(Item.bar_code.like('ENC%')).count() == 2
+
+def test_encoding_error_response(client):
+    response = client.post('/api/v1/import/stock?format=csv', data=io.BytesIO(b'item_id\n\xff\n'))
+    assert response.status_code == 400
+    assert response.json['result'] == {'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    assert response.json['errors'][0]['error'] == 'invalid_encoding'
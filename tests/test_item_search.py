@@ -0,0 +1,37 @@
+import pytest
+
+from server.models import db, Item
+from server.plugins import item_search
+from server.plugins.item_search import LikeSearch, match_items, select_backend
+
+TERMS = ['item 1', 'EST IT', '0011', 'm 1', 'st', 'T', 'Item"', '%', 'missing']
+
+@pytest.mark.parametrize('term', TERMS)
+def test_backends_match_substrings(app, store, term):
+    with app.test_request_context():
+        query = Item.query.filter(Item.bar_code.like('TEST%'))
+        indexed, _ = match_items(term, query)
+        like, _ = LikeSearch().match(query, term)
+        assert {item.id for item in indexed} == {item.id for item in like}
+
+def test_indexed_backend(app):
+    with app.app_context():
+        backend = select_backend()
+        expected = {'sqlite': 'fts5', 'postgresql': 'trigram'}.get(db.engine.dialect.name, 'like')
+        assert backend.name == expected and not backend.fallback
+
+def test_fallback_is_rechecked(app, monkeypatch):
+    with app.test_request_context():
+        monkeypatch.setitem(app.config, 'ITEM_SEARCH_BACKEND', 'auto')
+        monkeypatch.setitem(app.extensions, 'item_search', (None, None))
+        missing = LikeSearch()
+        missing.fallback = True
+        monkeypatch.setattr(item_search, 'select_backend', lambda name: missing)
+        match_items('rice')
+        assert app.extensions['item_search'][1] is not None
+        monkeypatch.setattr(item_search, 'select_backend', select_backend)
+        monkeypatch.setattr(item_search, 'RECHECK_SECONDS', 0)
+        app.extensions['item_search'] = (missing, 0)
+        match_items('rice')
+        assert app.extensions['item_search'][0] is not missing
+        assert app.extensions['item_search'][1] is None
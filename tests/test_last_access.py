@@ -0,0 +1,68 @@
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError
+
+from server.models import db, User
+from server.plugins.last_access import LastAccessTracker
+
+def test_written_users_are_bounded():
+    app = Flask(__name__)
+    app.config.update(LAST_ACCESS_INTERVAL=300, LAST_ACCESS_CACHE_SIZE=2)
+    tracker = LastAccessTracker(app)
+    for user_id in range(5):
+        tracker.touch(user_id)
+    assert len(tracker._written) == 2
+    assert len(tracker._pending) == 5
+    tracker._pending.clear()
+    tracker.touch(4)
+    tracker.touch(0)
+    assert list(tracker._pending) == [0]
+
+def test_failed_flush_is_retried(app, client, monkeypatch):
+    tracker = LastAccessTracker(Flask(__name__))
+    tracker.app = app
+    with app.app_context():
+        user_id = db.session.query(User.id).filter(User.username == 'admin').scalar()
+        db.session.query(User).filter(User.id == user_id).update({'last_access': None})
+        db.session.commit()
+        tracker.touch(user_id)
+
+        def locked(self, *args, **kwargs):
+            raise OperationalError('UPDATE user', {}, Exception('database is locked'))
+        with monkeypatch.context() as mp:
+            mp.setattr(Session, 'commit', locked)
+            tracker.flush()
+        assert user_id in tracker._pending
+
+        tracker.flush()
+        assert not tracker._pending
+        assert db.session.query(User.last_access).filter(User.id == user_id).scalar() is not None
+
+def test_flush_reuses_the_request_connection(app, client):
+    tracker = LastAccessTracker(Flask(__name__))
+    tracker.app = app
+    checked_out = [0]
+    most = []
+
+    def checkout(*args):
+        checked_out[0] += 1
+        most.append(checked_out[0])
+
+    def checkin(*args):
+        checked_out[0] -= 1
+
+    with app.test_request_context():
+        pool = db.engine.pool
+        event.listen(pool, 'checkout', checkout)
+        event.listen(pool, 'checkin', checkin)
+        try:
+            # the view's connection is still checked out when the request ends
+            user_id = db.session.query(User.id).filter(User.username == 'admin').scalar()
+            tracker.touch(user_id)
+            tracker.flush()
+        finally:
+            event.remove(pool, 'checkout', checkout)
+            event.remove(pool, 'checkin', checkin)
+    assert not tracker._pending
+    assert max(most) == 1
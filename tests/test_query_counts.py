@@ -0,0 +1,35 @@
+import pytest
+
+from server.plugins.receipts import invalidate_receipts
+from .conftest import count_queries
+
+def queries_of(client, url: str) -> list:
+    # the first request loads the session and the user into their caches
+    assert client.get(url).status_code == 200
+    with count_queries() as counter:
+        assert client.get(url).status_code == 200
+    return counter.statements
+
+@pytest.mark.parametrize('url, expected', [
+    ('/inventory', 1),
+    ('/item/all', 1),
+    ('/api/v1/items', 1),
+    ('/api/v1/search/item?search=Test', 1),
+    ('/purchase', 2),
+])
+def test_listing_query_count(client, url, expected):
+    statements = queries_of(client, url)
+    assert len(statements) == expected, statements
+
+def test_receipt_query_count(app, client, store):
+    url = f'/purchase/{store["purchases"][0]}'
+    # the reference id of the receipt URL
+    assert len(queries_of(client, url)) == 1
+    receipt_url = client.get(url).get_data(as_text=True).split('<iframe src="')[1].split('"')[0]
+    assert client.get(receipt_url).status_code == 200
+    with app.app_context():
+        invalidate_receipts()
+    with count_queries() as counter:
+        assert client.get(receipt_url).status_code == 200
+    # the reference id check, the purchase and its lines
+    assert counter.count == 3, counter.statements
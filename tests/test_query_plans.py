@@ -0,0 +1,13 @@
+import pytest
+
+from server import db
+from server.plugins.query_plans import FULL_SCANS, HOT_QUERIES, check_plan
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_an_index(app, name):
+    with app.app_context():
+        dialect = db.get_engine().dialect.name
+        if dialect not in FULL_SCANS:
+            pytest.skip(f'no full scan pattern for {dialect}')
+        plan, scans = check_plan(name)
+    assert not scans, '\n'.join(plan)
@@ -0,0 +1,47 @@
+import re
+
+from server.models import db, Item, Purchase
+from server.plugins.receipts import invalidate_receipts
+from .conftest import count_queries
+
+def receipt_url(client, purchase_id: int) -> str:
+    response = client.get(f'/purchase/{purchase_id}')
+    assert response.status_code == 200
+    return re.search(r'<iframe src="([^"]+)"', response.get_data(as_text=True)).group(1)
+
+def test_receipt_is_immutable(client, store):
+    url = receipt_url(client, store['purchases'][1])
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.cache_control.immutable and response.cache_control.private
+    etag, weak = response.get_etag()
+    assert not weak and 'csrf' not in response.get_data(as_text=True)
+    with count_queries() as counter:
+        assert client.get(url, headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+    assert not any('purchase' in statement for statement in counter.statements), counter.statements
+
+def test_receipt_needs_its_reference_id(client, store):
+    assert client.get(f'/purchase/{store["purchases"][1]}/receipt/unknown').status_code == 404
+
+def test_receipt_keeps_sold_name(app, client, store):
+    url = receipt_url(client, store['purchases'][2])
+    with app.app_context():
+        item = db.session.get(Item, store['items'][2])
+        name = item.name
+        item.name = 'Renamed Item'
+        db.session.commit()
+        invalidate_receipts()
+    try:
+        page = client.get(url).get_data(as_text=True)
+        assert name in page and 'Renamed Item' not in page
+    finally:
+        with app.app_context():
+            db.session.get(Item, store['items'][2]).name = name
+            db.session.commit()
+
+def test_delete_purchase(app, client, store):
+    with app.app_context():
+        purchase_id = Purchase.checkout({store['items'][3]: 1}).id
+        db.session.commit()
+    assert client.post(f'/purchase/{purchase_id}', data={'_method': 'DELETE'}).status_code == 302
+    assert client.get(f'/purchase/{purchase_id}').status_code == 404
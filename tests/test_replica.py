@@ -0,0 +1,42 @@
+import pytest
+
+from server import db
+from server.models import Item
+from server.plugins.barcode import lookup_barcode
+from server.plugins.pagination import paginate
+from server.plugins.replica import sync_sqlite_replica, use_replica
+
+@pytest.fixture
+def replica_app(app, store, tmp_path):
+    "Application reading from a SQLite copy that is only synced on demand"
+    primary = app.config['SQLALCHEMY_DATABASE_URI']
+    if not primary.startswith('sqlite'):
+        pytest.skip('the replica is a copy of a SQLite file')
+    replica = f'sqlite:///{tmp_path / "replica.db"}'
+    sync_sqlite_replica(primary, replica)
+    # the replica lags behind the item added after the sync
+    with app.app_context():
+        db.session.add(Item(name='Fresh Item', price=1, bar_code='FRESH0001'))
+        db.session.commit()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setitem(app.config, 'SQLALCHEMY_BINDS', {'replica': replica})
+        yield app
+        # the next replica gets its own engine
+        app.extensions['sqlalchemy'].connectors.pop('replica').get_engine().dispose()
+    with app.app_context():
+        Item.query.filter(Item.bar_code == 'FRESH0001').delete()
+        db.session.commit()
+
+def test_barcode_cache_filled_from_primary(replica_app):
+    with replica_app.test_request_context('/api/v1/barcode/FRESH0001'):
+        use_replica()
+        assert Item.query.filter(Item.bar_code == 'FRESH0001').first() is None
+        assert lookup_barcode('FRESH0001')['name'] == 'Fresh Item'
+        assert replica_app.extensions['barcode_cache'].get('FRESH0001') is not None
+
+def test_count_cache_filled_from_primary(replica_app):
+    with replica_app.test_request_context('/inventory'):
+        use_replica()
+        query = Item.query.filter(Item.bar_code.like('FRESH%'))
+        page = paginate(query, (Item.id,), count_key='test-replica-items')
+        assert page.items == [] and page.total == 1
@@ -0,0 +1,26 @@
+import pytest
+
+from server.plugins.flask_session.serializers import CompactSerializer
+
+@pytest.mark.parametrize('data', [
+    {},
+    {'signed_in': True, 'user_id': 1, 'csrftoken': 'a' * 32, '_permanent': None},
+    {'price': 1.5, 'names': ['Bigas', 'Asin'], 'nested': {'ñ': -2 ** 70}},
+])
+def test_json_round_trip(data):
+    serializer = CompactSerializer()
+    payload = serializer.dumps(data)
+    assert payload[:1] == serializer.version
+    assert serializer.loads(payload) == data
+
+@pytest.mark.parametrize('data', [
+    {'_flashes': [('message', 'Item saved')]},
+    {'token': b'\x00\x01'},
+    {'ids': {1: 'one'}},
+    {'text': '\udc80'},
+])
+def test_other_values_use_pickle(data):
+    serializer = CompactSerializer()
+    payload = serializer.dumps(data)
+    assert payload[:1] != serializer.version
+    assert serializer.loads(payload) == data
@@ -0,0 +1,36 @@
+import pytest
+
+from server.models import db, Item, Stock
+
+@pytest.mark.parametrize('form', [
+    {'item': 'one', 'quantity': '1', 'total-cost': '5', 'per-item-cost': '5'},
+    {'item': '{item}', 'quantity': '1.5', 'total-cost': '5', 'per-item-cost': '5'},
+    {'item': '{item}', 'quantity': '-1', 'total-cost': '5', 'per-item-cost': '5'},
+    {'item': '{item}', 'quantity': '1', 'total-cost': 'nan', 'per-item-cost': '5'},
+    {'item': '{item}', 'quantity': '1', 'total-cost': '5', 'per-item-cost': 'five'},
+])
+def test_add_stock_rejects_bad_input(client, store, form):
+    form = {key: value.format(item=store['items'][4]) for key, value in form.items()}
+    assert client.post('/stock', data=form).status_code == 400
+
+def test_add_stock_unknown_item(client):
+    form = {'item': '999999', 'quantity': '1', 'total-cost': '5', 'per-item-cost': '5'}
+    assert client.post('/stock', data=form).status_code == 404
+
+def test_add_stock(app, client, store):
+    item_id = store['items'][5]
+    with app.app_context():
+        before = db.session.get(Item, item_id).in_stock
+    form = {'item': str(item_id), 'quantity': '3', 'total-cost': '15', 'per-item-cost': '5'}
+    assert client.post('/stock', data=form).status_code == 302
+    with app.app_context():
+        assert db.session.get(Item, item_id).in_stock == before + 3
+
+def test_flush_refreshes_loaded_item(app, store):
+    with app.app_context():
+        item = db.session.get(Item, store['items'][6])
+        before = item.balance_on_hand
+        db.session.add(Stock(item_id=item.id, quantity=2, cost=10, per_item_cost=5))
+        db.session.flush()
+        assert item.balance_on_hand == before + 2
+        db.session.rollback()